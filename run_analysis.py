@@ -7,8 +7,7 @@ from pathlib import Path
 src_dir = Path(__file__).parent / "src"
 sys.path.insert(0, str(src_dir))
 
-from analysis import main
-
 
 if __name__ == "__main__":
+    from analysis import main
     main()
@@ -1,26 +1,38 @@
 """BDX Analysis Package public API."""
 
-from .config import AnalysisConfig, ParticleConfig, HistogramConfig, SurfaceConfig, BoxSurfaceConfig
-from .core import Analysis
-from .export_histograms import Exporter, export_histograms_to_pdf, export_all_analysis_histograms_to_pdf
-from .utils import setup_root, format_energy
-from .simulation_summary import SimulationSummary
-from .histogram import HistogramSet
-from .comparison import compare_histograms_overlay
+import importlib
 
-__all__ = [
-    "AnalysisConfig",
-    "ParticleConfig",
-    "HistogramConfig",
-    "SurfaceConfig",
-    "BoxSurfaceConfig",
-    "Analysis",
-    "Exporter",
-    "export_histograms_to_pdf",
-    "export_all_analysis_histograms_to_pdf",
-    "setup_root",
-    "format_energy",
-    "SimulationSummary",
-    "HistogramSet",
-    "compare_histograms_overlay",
-]
\ No newline at end of file
+# Public names are resolved on first access (PEP 562) so that importing the
+# package does not pull in ROOT until it is actually needed.
+_LAZY_ATTRS = {
+    "AnalysisConfig": ".config",
+    "ParticleConfig": ".config",
+    "HistogramConfig": ".config",
+    "SurfaceConfig": ".config",
+    "BoxSurfaceConfig": ".config",
+    "Analysis": ".core",
+    "Exporter": ".export_histograms",
+    "export_histograms_to_pdf": ".export_histograms",
+    "export_all_analysis_histograms_to_pdf": ".export_histograms",
+    "setup_root": ".utils",
+    "format_energy": ".utils",
+    "SimulationSummary": ".simulation_summary",
+    "SummaryResult": ".simulation_summary",
+    "HistogramSet": ".histogram",
+    "compare_histograms_overlay": ".comparison",
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -5,50 +5,57 @@ Unified analysis CLI: processes configs, runs analysis, and handles exports.
 
 import sys
 import os
-import glob
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Iterator, List, Optional, Tuple
 
 from config import AnalysisConfig
-from core import Analysis
 
-try:
-    from export_histograms import (
-        export_all_analysis_histograms_to_pdf,
-        export_histogram_statistics_to_excel,
-    )
-except Exception:
-    export_all_analysis_histograms_to_pdf = None
-    export_histogram_statistics_to_excel = None
+
+CONFIG_EXTENSIONS = {'.yaml', '.yml', '.json'}
+
+
+def find_config_files(config_dir: str) -> Iterator[str]:
+    """Yield config files under config_dir as they are found (sorted within each directory)."""
+    # Single traversal; hidden entries are skipped like glob does
+    with os.scandir(config_dir) as it:
+        entries = sorted((e for e in it if not e.name.startswith('.')), key=lambda e: e.name)
+    for entry in entries:
+        # Symlinked directories are not followed, so a symlink loop cannot recurse forever
+        if entry.is_dir(follow_symlinks=False):
+            yield from find_config_files(entry.path)
+        elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in CONFIG_EXTENSIONS:
+            yield entry.path
 
 
-def find_config_files(config_dir: str) -> List[str]:
-    config_extensions = ['*.yaml', '*.yml', '*.json']
-    config_files = set()
-    for ext in config_extensions:
-        pattern = os.path.join(config_dir, '**', ext)
-        config_files.update(glob.glob(pattern, recursive=True))
-    return sorted(list(config_files))
+# Resolved surface bound attribute, with the raw config key as fallback
+_SURF_FIELDS = (('x_min', 'xl'), ('x_max', 'xh'), ('y_min', 'yl'), ('y_max', 'yh'))
 
 
 def _resolve_surface_dims(config: AnalysisConfig) -> Optional[Tuple[float, float, float, float]]:
-    try:
-        if getattr(config, 'surfaces', None) and len(config.surfaces) > 0:
-            surf = config.surfaces[0]
-            xl = getattr(surf, 'x_min', getattr(surf, 'xl', None))
-            xh = getattr(surf, 'x_max', getattr(surf, 'xh', None))
-            yl = getattr(surf, 'y_min', getattr(surf, 'yl', None))
-            yh = getattr(surf, 'y_max', getattr(surf, 'yh', None))
-            if xl is not None and xh is not None and yl is not None and yh is not None:
-                return (xl, xh, yl, yh)
-    except Exception:
+    surfaces = getattr(config, 'surfaces', None)
+    if not surfaces:
         return None
-    return None
+    surf = surfaces[0]
+    vals = tuple(getattr(surf, a, None) if hasattr(surf, a) else getattr(surf, b, None) for a, b in _SURF_FIELDS)
+    return vals if None not in vals else None
 
 
 def process_single_config(config_path: str, args: argparse.Namespace) -> bool:
+    # ROOT-dependent modules are imported here so that `--help` stays fast
     try:
+        from export_histograms import (
+            export_all_analysis_histograms_to_pdf,
+            export_histogram_statistics_to_excel,
+        )
+    except Exception:
+        export_all_analysis_histograms_to_pdf = None
+        export_histogram_statistics_to_excel = None
+
+    try:
+        from core import Analysis
+
         print(f"\n{'='*60}")
         print(f"Processing config: {config_path}")
         print(f"{'='*60}")
@@ -61,57 +68,70 @@ def process_single_config(config_path: str, args: argparse.Namespace) -> bool:
             config.output.directory = args.output_dir
 
         # Run analysis
-        analyzer = Analysis(config, save_macro=bool(getattr(args, 'save_macro', False)))
+        analyzer = Analysis(
+            config,
+            save_macro=bool(getattr(args, 'save_macro', False)),
+            combine_comparisons=bool(getattr(args, 'combine_comparisons', False)),
+            verbose=bool(getattr(args, 'verbose', False)),
+            comparison_jobs=getattr(args, 'comparison_jobs', 1),
+        )
         analyzer.process_all_configs()
         print(f"\n{'='*60}")
         print(f"✓ Analysis completed successfully for {config_path}")
         print(f"{'='*60}\n")
 
-        # Save histograms to PDF (default True; --no-save-pdf to skip)
-        if args.save_pdf and export_all_analysis_histograms_to_pdf:
-            print(f"\n{'='*60}")
-            print(f"Saving all histograms to PDF in {config.output.directory}/plots ...")
-            energy_ranges = [(hist.min_energy, hist.max_energy) for hist in config.histograms]
-            export_all_analysis_histograms_to_pdf(
-                config.output.directory,
-                particle_name=config.particle.name,
-                energy_ranges=energy_ranges,
-                save_macro=args.save_macro,
-            )
-            print("✓ Histograms saved as PDF successfully.")
-            print(f"{'='*60}\n")
-        elif not args.save_pdf:
-            print(f"\n{'='*60}")
-            print("↷ Skipping PDF export (disabled by flag).")
-            print(f"{'='*60}\n")
-        else:
-            print(f"\n{'='*60}")
-            print("⚠ PDF export helper unavailable; histograms saved only as ROOT files.")
-            print(f"{'='*60}\n")
-
-        # Save histogram statistics to Excel (default True; --no-save-hstat to skip)
-        if args.save_hstat and export_histogram_statistics_to_excel:
-            print(f"\n{'='*60}")
-            print(f"Saving histogram statistics to Excel in {config.output.directory} ...")
-            energy_ranges = [(hist.min_energy, hist.max_energy) for hist in config.histograms]
-            surface_dims = _resolve_surface_dims(config)
-            export_histogram_statistics_to_excel(
-                config.output.directory,
-                particle_name=config.particle.name,
-                energy_ranges=energy_ranges,
-                excel_filename="histogram_statistics.xlsx",
-                surface_dims=surface_dims,
-            )
-            print("✓ Histogram statistics saved as Excel file!")
-            print(f"{'='*60}\n")
-        elif not args.save_hstat:
-            print(f"\n{'='*60}")
-            print("↷ Skipping histogram statistics export (disabled by flag).")
-            print(f"{'='*60}\n")
-        else:
-            print(f"\n{'='*60}")
-            print("⚠ Statistics export helper unavailable; no Excel written.")
-            print(f"{'='*60}\n")
+        energy_ranges = [(hist.min_energy, hist.max_energy) for hist in config.histograms]
+
+        def export_pdf():
+            # Save histograms to PDF (default True; --no-save-pdf to skip)
+            if args.save_pdf and export_all_analysis_histograms_to_pdf:
+                print(f"\n{'='*60}")
+                print(f"Saving all histograms to PDF in {config.output.directory}/plots ...")
+                export_all_analysis_histograms_to_pdf(
+                    config.output.directory,
+                    particle_name=config.particle.name,
+                    energy_ranges=energy_ranges,
+                    save_macro=args.save_macro,
+                    multipage=bool(getattr(args, 'multipage_pdf', False)),
+                    jobs=getattr(args, 'export_jobs', 1),
+                )
+                print("✓ Histograms saved as PDF successfully.")
+                print(f"{'='*60}\n")
+            elif not args.save_pdf:
+                print(f"\n{'='*60}")
+                print("↷ Skipping PDF export (disabled by flag).")
+                print(f"{'='*60}\n")
+            else:
+                print(f"\n{'='*60}")
+                print("⚠ PDF export helper unavailable; histograms saved only as ROOT files.")
+                print(f"{'='*60}\n")
+
+        def export_stats():
+            # Save histogram statistics to Excel (default True; --no-save-hstat to skip)
+            if args.save_hstat and export_histogram_statistics_to_excel:
+                print(f"\n{'='*60}")
+                print(f"Saving histogram statistics to Excel in {config.output.directory} ...")
+                surface_dims = _resolve_surface_dims(config)
+                export_histogram_statistics_to_excel(
+                    config.output.directory,
+                    particle_name=config.particle.name,
+                    energy_ranges=energy_ranges,
+                    excel_filename="histogram_statistics.xlsx",
+                    surface_dims=surface_dims,
+                )
+                print("✓ Histogram statistics saved as Excel file!")
+                print(f"{'='*60}\n")
+            elif not args.save_hstat:
+                print(f"\n{'='*60}")
+                print("↷ Skipping histogram statistics export (disabled by flag).")
+                print(f"{'='*60}\n")
+            else:
+                print(f"\n{'='*60}")
+                print("⚠ Statistics export helper unavailable; no Excel written.")
+                print(f"{'='*60}\n")
+
+        export_pdf()
+        export_stats()
 
         return True
     except Exception as e:
@@ -122,14 +142,24 @@ def process_single_config(config_path: str, args: argparse.Namespace) -> bool:
 
 
 def main():
-    parser = argparse.ArgumentParser(description="Run BDX Analysis and optionally save histograms and statistics.")
+    parser = argparse.ArgumentParser(
+        description="Run BDX Analysis and optionally save histograms and statistics.",
+        epilog=("Environment: BDX_MT sets the number of ROOT implicit multi-threading threads (default: all cores); "
+                "BDX_STAGE_DIR (e.g. /dev/shm) stages exported plots there before moving them into plots/."),
+    )
     parser.add_argument("-i", "--input-dir", help="Input directory for simulation ROOT files")
     parser.add_argument("config", nargs='?', help="Path to the configuration file (JSON or YAML)")
     parser.add_argument("--config-dir", help="Directory containing multiple config files to process")
     parser.add_argument("--no-save-pdf", action="store_false", dest="save_pdf", default=True, help="Do not save all histograms to PDF after analysis")
     parser.add_argument("--save-macro", action="store_true", help="Also save each plot as ROOT macro (.C) when exporting PDFs")
+    parser.add_argument("--multipage-pdf", action="store_true", help="Write the exported histograms of each ROOT file into a single multi-page PDF")
+    parser.add_argument("--combine-comparisons", action="store_true", help="Write all comparison plots of a config into a single multi-page comparisons.pdf")
     parser.add_argument("--no-save-hstat", action="store_false", dest="save_hstat", default=True, help="Do not save histogram statistics to Excel after analysis")
     parser.add_argument("--output-dir", help="Override output directory from config file")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print the table of compared histograms for each comparison")
+    parser.add_argument("--comparison-jobs", type=int, default=1, help="Number of comparison plots drawn in parallel processes (default: 1, serial)")
+    parser.add_argument("--export-jobs", type=int, default=1, help="Number of ROOT files exported to PDF in parallel processes (default: 1, serial)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of config files processed in parallel with --config-dir (default: 1, serial; unless BDX_MT is set, each job gets #cores/jobs ROOT threads)")
     args = parser.parse_args()
 
     # Validate arguments
@@ -155,26 +185,49 @@ def main():
             print(f"Error: Directory '{args.config_dir}' does not exist")
             sys.exit(1)
 
-        config_files = find_config_files(args.config_dir)
-        if not config_files:
-            print(f"No config files found in directory '{args.config_dir}'")
-            sys.exit(1)
-
-        print(f"Found {len(config_files)} config files in '{args.config_dir}':")
-        for config_file in config_files:
-            print(f"  - {config_file}")
-
         successful = 0
         failed = 0
         failed_files: List[str] = []
+        config_files: List[str] = []
+
+        if args.jobs <= 1:
+            # Collected first (a cheap directory walk) so progress can show the total
+            config_files = list(find_config_files(args.config_dir))
+            for i, config_file in enumerate(config_files, 1):
+                print(f"\n[{i}/{len(config_files)}] Processing {os.path.basename(config_file)}...")
+                if process_single_config(config_file, args):
+                    successful += 1
+                else:
+                    failed += 1
+                    failed_files.append(config_file)
+        else:
+            # Configs are independent: each worker opens its own ROOT files.
+            # Share the cores between the workers' implicit-MT pools (read by setup_root)
+            # instead of letting every worker start one thread per core.
+            if "BDX_MT" not in os.environ:
+                os.environ["BDX_MT"] = str(max(1, (os.cpu_count() or 1) // args.jobs))
+            # Jobs are submitted while the directory walk is still in progress.
+            print(f"Config files in '{args.config_dir}':")
+            with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+                futures = {}
+                for config_file in find_config_files(args.config_dir):
+                    config_files.append(config_file)
+                    print(f"  - {config_file}")
+                    futures[executor.submit(process_single_config, config_file, args)] = config_file
+                if futures:
+                    print(f"\nProcessing {len(futures)} config files with {args.jobs} parallel jobs...")
+                for i, future in enumerate(as_completed(futures), 1):
+                    config_file = futures[future]
+                    print(f"\n[{i}/{len(futures)}] Finished {os.path.basename(config_file)}")
+                    if future.result():
+                        successful += 1
+                    else:
+                        failed += 1
+                        failed_files.append(config_file)
 
-        for i, config_file in enumerate(config_files, 1):
-            print(f"\n[{i}/{len(config_files)}] Processing {os.path.basename(config_file)}...")
-            if process_single_config(config_file, args):
-                successful += 1
-            else:
-                failed += 1
-                failed_files.append(config_file)
+        if not config_files:
+            print(f"No config files found in directory '{args.config_dir}'")
+            sys.exit(1)
 
         print(f"\n{'='*60}")
         print(f"BATCH PROCESSING SUMMARY")
@@ -1,55 +1,177 @@
 # Comparison plotting utilities for overlaying histograms from multiple files
+import atexit
+import os
+from functools import lru_cache
 from pathlib import Path
-from ROOT import TFile, TCanvas, TLegend
+import numpy as np
+from kernels import nonzero_minmax
 
 try:
     from tabulate import tabulate
-    import pandas as pd
-    HAS_TABULATE_PANDAS = True
+    HAS_TABULATE = True
 except ImportError:
-    HAS_TABULATE_PANDAS = False
+    HAS_TABULATE = False
 
 
 # Excel files are now saved individually for each comparison
 
-def _write_comparison_table_to_excel_and_print(cmp, integrals, errors, error_percents, output_dir=None):
-	from pathlib import Path
-	def short_path(path, keep=2):
-		parts = Path(path).parts
-		if len(parts) > keep:
-			return '.../' + '/'.join(parts[-keep:])
-		return path
-	if not HAS_TABULATE_PANDAS:
-		return
-	def fmt_sci(val):
-		try:
-			if isinstance(val, (float, int)):
-				return f"{val:.2E}"
-			elif isinstance(val, str):
-				return val
-			else:
-				return str(val)
-		except Exception:
-			return val
-	def fmt_perc(val):
+# Output directories already created by this process
+_MKDIR_SEEN = set()
+
+def _ensure_dir(path):
+	key = str(path)
+	if key not in _MKDIR_SEEN:
+		Path(key).mkdir(parents=True, exist_ok=True)
+		_MKDIR_SEEN.add(key)
+
+# Open ROOT files keyed by absolute path, shared by all comparisons of the process:
+# path -> (mtime_ns when opened, TFile); remote files have no mtime (None)
+_FILE_CACHE = {}
+_FILE_CACHE_CLOSE_REGISTERED = False
+
+def _close_cached_files():
+	for _, tfile in _FILE_CACHE.values():
+		if tfile.IsOpen():
+			tfile.Close()
+	_FILE_CACHE.clear()
+
+def _open_root_file(path):
+	"""Open a ROOT file read-only, reusing an already open handle for the same, unchanged file."""
+	global _FILE_CACHE_CLOSE_REGISTERED
+	import ROOT
+	remote = "://" in path
+	key = path if remote else os.path.abspath(path)
+	try:
+		mtime_ns = None if remote else os.stat(key).st_mtime_ns
+	except OSError:
+		return None
+	cached = _FILE_CACHE.get(key)
+	if cached is not None:
+		cached_mtime_ns, tfile = cached
+		if cached_mtime_ns == mtime_ns and tfile.IsOpen():
+			return tfile
+		# The file was rewritten (e.g. RECREATEd by a later analysis): drop the stale handle
+		if tfile.IsOpen():
+			tfile.Close()
+		del _FILE_CACHE[key]
+	tfile = ROOT.TFile.Open(key, "READ")
+	if not tfile or tfile.IsZombie():
+		return None
+	if not _FILE_CACHE_CLOSE_REGISTERED:
+		# Registered after ROOT is imported so it runs before ROOT's own teardown
+		atexit.register(_close_cached_files)
+		_FILE_CACHE_CLOSE_REGISTERED = True
+	_FILE_CACHE[key] = (mtime_ns, tfile)
+	return tfile
+
+def _get_histogram(path, hname):
+	"""Read a fresh, Python-owned copy of a histogram from a (cached) ROOT file."""
+	import ROOT
+	tfile = _open_root_file(path)
+	if tfile is None:
+		return None
+	h = tfile.Get(hname)
+	if h:
+		# Detach so the next comparison re-reads pristine contents instead of this styled object
+		h.SetDirectory(ROOT.nullptr)
+		ROOT.SetOwnership(h, True)
+	return h
+
+# Bin content storage of the concrete 1D histogram classes (TArrayC/S/I/L/F/D)
+_CONTENT_DTYPES = {
+	"TH1C": np.int8,
+	"TH1S": np.int16,
+	"TH1I": np.int32,
+	"TH1L": np.int64,
+	"TH1F": np.float32,
+	"TH1D": np.float64,
+}
+
+def _bin_contents(h):
+	"""Return the in-range bin contents of a 1D histogram (a zero-copy view for TH1C/S/I/L/F/D)."""
+	n_bins = h.GetNbinsX()
+	dtype = _CONTENT_DTYPES.get(h.ClassName())
+	if dtype is not None:
 		try:
-			if isinstance(val, (float, int)):
-				return f"{val:.2f}%"
-			elif isinstance(val, str):
-				return val
-			else:
-				return str(val)
-		except Exception:
-			return val
-	table = [
-		(h, short_path(f), label, fmt_sci(ing), fmt_sci(err), fmt_perc(errp))
-		for h, f, label, ing, err, errp in zip(cmp.hists, cmp.files, cmp.labels, integrals, errors, error_percents)
-	]
-	print("  Comparing the following histograms:")
-	print(tabulate(table, headers=["Histogram", "File", "Name", "Integral", "Error", "Error %"], tablefmt="rounded_grid"))
+			return np.frombuffer(h.GetArray(), dtype=dtype, count=n_bins + 2)[1:-1]
+		except TypeError:
+			pass  # buffer not exposed by this binding (e.g. Char_t* as a string)
+	# TProfile (GetArray holds sums, not means) and other classes: ask ROOT per bin
+	return np.fromiter((h.GetBinContent(i) for i in range(1, n_bins + 1)), dtype=np.float64, count=n_bins)
+
+def _bin_edges(h):
+	"""Return the N+1 bin edges of the x axis, handling both fixed and variable binning."""
+	axis = h.GetXaxis()
+	n_bins = h.GetNbinsX()
+	xbins = axis.GetXbins()
+	if xbins.GetSize() > 0:
+		return np.frombuffer(xbins.GetArray(), dtype=np.float64, count=n_bins + 1)
+	return np.linspace(axis.GetXmin(), axis.GetXmax(), n_bins + 1)
+
+def _integral_and_error_np(h):
+	"""Equivalent of h.IntegralAndError(1, N, err, "width") computed with NumPy reductions."""
+	n_bins = h.GetNbinsX()
+	if h.ClassName() not in _CONTENT_DTYPES:
+		# Profiles store sums of y and y^2 per bin: let ROOT compute their integral and error
+		import ctypes
+		err = ctypes.c_double(0.0)
+		integral = h.IntegralAndError(1, n_bins, err, "width")
+		return float(integral), float(err.value)
+	contents = _bin_contents(h).astype(np.float64, copy=False)
+	widths = np.diff(_bin_edges(h))
+	if h.GetSumw2N() > 0:
+		sumw2 = np.frombuffer(h.GetSumw2().GetArray(), dtype=np.float64, count=n_bins + 2)[1:-1]
+	else:
+		sumw2 = np.abs(contents)
+	integral = float(np.dot(contents, widths))
+	error = float(np.sqrt(np.dot(sumw2, widths * widths)))
+	return integral, error
+
+def _format_column(values, fmt):
+	"""Format a column of numbers in one NumPy pass; non-numeric entries become 'N/A'."""
+	arr = np.asarray([v if isinstance(v, (int, float)) else np.nan for v in values], dtype=np.float64)
+	return np.where(np.isnan(arr), 'N/A', np.char.mod(fmt, arr)).tolist()
+
+@lru_cache(maxsize=128)
+def _short_path(path, keep=2):
+	parts = Path(path).parts
+	if len(parts) > keep:
+		return '.../' + '/'.join(parts[-keep:])
+	return path
+
+# (integral, error) keyed by (absolute path, histogram name, file mtime_ns)
+_INT_CACHE = {}
+
+def _cached_integral_and_error(path, hname, h):
+	"""Return the histogram integral and error, reusing results for unchanged local files."""
+	if "://" in path:
+		return _integral_and_error_np(h)
+	abspath = os.path.abspath(path)
+	key = (abspath, hname, os.stat(abspath).st_mtime_ns)
+	result = _INT_CACHE.get(key)
+	if result is None:
+		result = _integral_and_error_np(h)
+		_INT_CACHE[key] = result
+	return result
+
+def _write_comparison_table_to_excel_and_print(cmp, integrals, errors, error_percents, output_dir=None, verbose=True):
+	table = list(zip(
+		cmp.hists,
+		(_short_path(f) for f in cmp.files),
+		cmp.labels,
+		_format_column(integrals, '%.2E'),
+		_format_column(errors, '%.2E'),
+		_format_column(error_percents, '%.2f%%'),
+	))
+	headers = ["Histogram", "File", "Name", "Integral", "Error", "Error %"]
+	if verbose:
+		print("  Comparing the following histograms:")
+		if HAS_TABULATE:
+			print(tabulate(table, headers=headers, tablefmt="rounded_grid"))
+		else:
+			for row in table:
+				print("    " + " | ".join(str(v) for v in row))
 
-	# Save to a single Excel file with multiple sheets
-	df = pd.DataFrame(table, columns=["Histogram", "File", "Name", "Integral", "Error", "Error %"])
 	config_output_dir = getattr(cmp, 'output_directory', None)
 	if config_output_dir:
 		outdir = config_output_dir
@@ -57,47 +179,56 @@ def _write_comparison_table_to_excel_and_print(cmp, integrals, errors, error_per
 		outdir = output_dir
 	else:
 		outdir = getattr(cmp, 'output_dir', None) or '.'
-	Path(outdir).mkdir(parents=True, exist_ok=True)
+	_ensure_dir(outdir)
 	# Create individual Excel file for each comparison
 	# Use the output config option for the Excel filename
 	excel_filename = f"{cmp.output}.xlsx"
 	excel_path = str(Path(outdir) / excel_filename)
 	
 	try:
-		# Create a new Excel writer for this specific comparison
-		with pd.ExcelWriter(excel_path, engine="xlsxwriter") as writer:
-			# Use the output name as sheet name (single sheet per file)
-			sheet_name = str(cmp.output)[:31]  # Excel sheet name max 31 chars
-			df.to_excel(writer, sheet_name=sheet_name, index=False)
-			print(f"    Saved comparison table to Excel file: {excel_path}")
+		import xlsxwriter
+		# Stream rows straight to the sheet; constant_memory flushes each row as it is written
+		workbook = xlsxwriter.Workbook(excel_path, {'constant_memory': True, 'strings_to_numbers': False})
+		# Use the output name as sheet name (single sheet per file)
+		worksheet = workbook.add_worksheet(str(cmp.output)[:31])  # Excel sheet name max 31 chars
+		worksheet.write_row(0, 0, headers)
+		for row_idx, row in enumerate(table, 1):
+			worksheet.write_row(row_idx, 0, row)
+		workbook.close()
+		print(f"    Saved comparison table to Excel file: {excel_path}")
 	except ImportError:
-		print("  Comparing the following histograms:")
-		# Fallback: print without integral or error
-		for h, f, label in zip(cmp.hists, cmp.files, cmp.labels):
-			print(f"    {h:30} | {short_path(f):50} | {label}")
+		# No Excel engine: keep the table as CSV next to where the workbook would be
+		import csv
+		csv_path = str(Path(outdir) / f"{cmp.output}.csv")
+		with open(csv_path, 'w', newline='') as f:
+			writer = csv.writer(f)
+			writer.writerow(headers)
+			writer.writerows(table)
+		print(f"    Saved comparison table to CSV file: {csv_path}")
 
-def compare_histograms_overlay(cmp, output_dir=None):
+def compare_histograms_overlay(cmp, output_dir=None, multipage_pdf=None, verbose=True):
 	"""
 	Overlay multiple histograms from different files on the same canvas.
 	Args:
 		cmp: ComparisonConfig object (should have .files, .hists, .labels, .output, .title, .x_label, .y_label, .logx, .logy)
 		output_dir: Optional override for output directory
+		multipage_pdf: Optional path of an already opened multi-page PDF; the plot is
+			appended as a new page instead of being saved to its own PDF file
+		verbose: Print the table of compared histograms with their integrals
 	"""
-	import ctypes
-	# Open files and get integrals and errors for each histogram
-	files = [TFile(f, "READ") for f in cmp.files]
-	hists = [f.Get(hname) for f, hname in zip(files, cmp.hists)]
+	from ROOT import TCanvas, TLegend, TH1F
+	# Open files (shared across comparisons) and get integrals and errors for each histogram
+	hists = [_get_histogram(f, hname) for f, hname in zip(cmp.files, cmp.hists)]
 	integrals = []
 	errors = []
 	error_percents = []
-	for h in hists:
+	for path, hname, h in zip(cmp.files, cmp.hists, hists):
 		if h:
-			err = ctypes.c_double(0.0)
-			integral = h.IntegralAndError(1, h.GetNbinsX(), err, "width")
+			integral, err = _cached_integral_and_error(path, hname, h)
 			integrals.append(integral)
-			errors.append(err.value)
+			errors.append(err)
 			if integral != 0:
-				error_percents.append(100.0 * err.value / abs(integral))
+				error_percents.append(100.0 * err / abs(integral))
 			else:
 				error_percents.append('N/A')
 		else:
@@ -106,7 +237,8 @@ def compare_histograms_overlay(cmp, output_dir=None):
 			error_percents.append('N/A')
 	_write_comparison_table_to_excel_and_print(
 		cmp, integrals, errors, error_percents,
-		output_dir=output_dir
+		output_dir=output_dir,
+		verbose=verbose
 	)
 	for i, h in enumerate(hists):
 		if not h:
@@ -114,8 +246,6 @@ def compare_histograms_overlay(cmp, output_dir=None):
 	hists = [h for h in hists if h]
 	if len(hists) < 2:
 		print("    Not enough histograms to compare.")
-		for f in files:
-			f.Close()
 		return
 	canvas = TCanvas(f"c_{cmp.output}", cmp.title, 700, 600)
 	# Increase right margin for legend and axis labels
@@ -213,16 +343,13 @@ def compare_histograms_overlay(cmp, output_dir=None):
 		min_x = None
 		max_x = None
 		for h in hists:
-			for b in range(1, h.GetNbinsX() + 1):
-				val = h.GetBinContent(b)
-				if val > 0:
-					x = h.GetBinCenter(b)
-					if min_y is None or val < min_y:
-						min_y = val
-					if min_x is None or x < min_x:
-						min_x = x
-					if max_x is None or x > max_x:
-						max_x = x
+			edges = _bin_edges(h)
+			h_min_y, h_min_x, h_max_x = nonzero_minmax(_bin_contents(h), 0.5 * (edges[:-1] + edges[1:]))
+			if h_min_y == np.inf:
+				continue
+			min_y = h_min_y if min_y is None else min(min_y, h_min_y)
+			min_x = h_min_x if min_x is None else min(min_x, h_min_x)
+			max_x = h_max_x if max_x is None else max(max_x, h_max_x)
 		if min_y is None:
 			min_y = 0
 		# Calculate a small shift for x-axis minimum (5% of the x-range or a small fixed value)
@@ -240,16 +367,23 @@ def compare_histograms_overlay(cmp, output_dir=None):
 		if y_axis_max is None:
 			y_axis_max = None  # Let ROOT autoscale
 
-	# Create cloned histograms for legend with thick lines
-	legend_hists = []
-	for i, h in enumerate(hists):
-		# Clone histogram for legend with thick lines
-		legend_hist = h.Clone(f"{h.GetName()}_legend")
-		color = colors[i % len(colors)]
-		legend_hist.SetLineColor(color)
-		legend_hist.SetMarkerColor(color)  # Set marker color to match line color
-		legend_hist.SetLineWidth(3)  # Always thick for legend
-		legend_hists.append(legend_hist)
+	# Get draw option from config, default to "hist"
+	draw_option = getattr(cmp, 'draw_option', 'hist')
+
+	if draw_option.strip().lower() in ('hist', 'hist same') and line_width >= 3:
+		# Drawn lines are already thick enough: the histograms serve as legend entries
+		legend_hists = hists
+	else:
+		# Create single-bin proxies for legend with thick lines (no need to copy bin data)
+		legend_hists = []
+		for i, h in enumerate(hists):
+			legend_hist = TH1F(f"{cmp.output}_legend_{i}", "", 1, 0, 1)
+			legend_hist.SetDirectory(0)
+			color = colors[i % len(colors)]
+			legend_hist.SetLineColor(color)
+			legend_hist.SetMarkerColor(color)  # Set marker color to match line color
+			legend_hist.SetLineWidth(3)  # Always thick for legend
+			legend_hists.append(legend_hist)
 	
 	# Set axis ranges on all histograms before drawing
 	for h in hists:
@@ -260,9 +394,6 @@ def compare_histograms_overlay(cmp, output_dir=None):
 		if y_axis_max is not None:
 			h.SetMaximum(y_axis_max)
 	
-	# Get draw option from config, default to "hist"
-	draw_option = getattr(cmp, 'draw_option', 'hist')
-	
 	for i, h in enumerate(hists):
 		color = colors[i % len(colors)]
 		h.SetLineColor(color)
@@ -273,16 +404,18 @@ def compare_histograms_overlay(cmp, output_dir=None):
 		else:
 			h.Draw(f"{draw_option}same")
 		
-		# Add legend entry using the thick clone
+		# Add legend entry using the thick proxy
 		legend.AddEntry(legend_hists[i], cmp.labels[i] if i < len(cmp.labels) else f"Hist {i+1}", "l")
-		if getattr(cmp, 'x_label', None):
-			h.GetXaxis().SetTitle(cmp.x_label)
-			h.GetXaxis().SetTitleOffset(1.6)  # Increase offset for better spacing
-		if getattr(cmp, 'y_label', None):
-			h.GetYaxis().SetTitle(cmp.y_label)
-			h.GetYaxis().SetTitleOffset(1.6)  # Increase offset for better spacing
-		if getattr(cmp, 'title', None):
-			h.SetTitle(cmp.title)
+	# Frame title and axes come from the first histogram drawn
+	h0 = hists[0]
+	if getattr(cmp, 'x_label', None):
+		h0.GetXaxis().SetTitle(cmp.x_label)
+		h0.GetXaxis().SetTitleOffset(1.6)  # Increase offset for better spacing
+	if getattr(cmp, 'y_label', None):
+		h0.GetYaxis().SetTitle(cmp.y_label)
+		h0.GetYaxis().SetTitleOffset(1.6)  # Increase offset for better spacing
+	if getattr(cmp, 'title', None):
+		h0.SetTitle(cmp.title)
 	legend.SetFillStyle(0)
 	legend.SetBorderSize(1)
 	legend.Draw()
@@ -294,17 +427,22 @@ def compare_histograms_overlay(cmp, output_dir=None):
 		outdir = output_dir
 	else:
 		outdir = getattr(cmp, 'output_dir', None) or '.'
-	Path(outdir).mkdir(parents=True, exist_ok=True)
+	_ensure_dir(outdir)
+	# Optionally save ROOT macro (.C) alongside PDF when requested in config.
+	# The macro is written first, while the drawn primitives are still unrendered.
+	if getattr(cmp, 'save_macro', False):
+		out_macro_path = str(Path(outdir) / f"{cmp.output}.C")
+		try:
+			canvas.SaveAs(out_macro_path)
+			print(f"    Saved comparison macro: {out_macro_path}")
+		except Exception as e:
+			print(f"    Warning: Could not save comparison macro {out_macro_path}: {e}")
+	if multipage_pdf:
+		canvas.Print(multipage_pdf, f"Title:{cmp.output}")
+		print(f"    Added comparison plot to: {multipage_pdf}")
+		return
 	out_pdf_path = str(Path(outdir) / f"{cmp.output}.pdf")
 	canvas.SaveAs(out_pdf_path)
 	print(f"    Saved comparison plot: {out_pdf_path}")
-	# Optionally save ROOT macro (.C) alongside PDF when requested in config
-	try:
-		if getattr(cmp, 'save_macro', False):
-			out_macro_path = str(Path(outdir) / f"{cmp.output}.C")
-			canvas.SaveAs(out_macro_path)
-			print(f"    Saved comparison macro: {out_macro_path}")
-	except Exception:
-		pass
 
 # Individual Excel files are saved immediately for each comparison
@@ -1,11 +1,14 @@
+import os
+import sys
 import numpy as np
-import datetime
 from dataclasses import dataclass, field
 from typing import List, Dict, Tuple, Optional, Any, Union
 from pathlib import Path
-from utils import format_energy
 
-@dataclass
+# Slotted dataclasses (no per-instance __dict__) where supported (Python 3.10+)
+_DATACLASS_OPTIONS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_DATACLASS_OPTIONS)
 class ComparisonConfig:
     files: List[str]
     hists: List[str]
@@ -26,8 +29,9 @@ class ComparisonConfig:
     line_width: int = 2                     # Line thickness (same for all histograms)
     legend_position: str = "top_right"      # Legend position: top_right, top_left, bottom_right, bottom_left, center_right
     draw_option: str = "hist"               # Draw option for histograms (e.g., "hist", "histe", etc.)
+    save_macro: bool = False                # Also save the plot as ROOT macro (.C); set from the CLI flag
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class SurfaceConfig:
     id: int
     xl: Optional[float] = None
@@ -39,6 +43,18 @@ class SurfaceConfig:
     bin_width: float = 0.5
     name: Optional[str] = None
     spatial_analysis: bool = True
+    # Resolved plot axes, derived from the provided coordinates in __post_init__
+    x_axis: str = field(init=False, repr=False, compare=False)
+    y_axis: str = field(init=False, repr=False, compare=False)
+    x_min: float = field(init=False, repr=False, compare=False)
+    x_max: float = field(init=False, repr=False, compare=False)
+    y_min: float = field(init=False, repr=False, compare=False)
+    y_max: float = field(init=False, repr=False, compare=False)
+    _axis_variables: Tuple[str, str] = field(init=False, repr=False, compare=False)
+    _axis_labels: Tuple[str, str] = field(init=False, repr=False, compare=False)
+    _filter_expr: str = field(init=False, repr=False, compare=False)
+    _spatial_filter_expr: str = field(init=False, repr=False, compare=False)
+    _bin_counts: Tuple[int, int] = field(init=False, repr=False, compare=False)
     
     def __post_init__(self):
         if self.name is None:
@@ -46,23 +62,28 @@ class SurfaceConfig:
         
         # Determine axis configuration based on which coordinates are provided
         self._determine_axis_config()
+        axis_map = {'x': 'Vx', 'y': 'Vy', 'z': 'Vz'}
+        self._axis_variables = (axis_map[self.x_axis], axis_map[self.y_axis])
+        self._axis_labels = (f"{self.x_axis} [cm]", f"{self.y_axis} [cm]")
+        # ROOT caches jitted filters by expression string, so build them once per surface
+        x_var, y_var = self._axis_variables
+        self._filter_expr = sys.intern(f"SurfaceID == {self.id}")
+        self._spatial_filter_expr = sys.intern(
+            f"{x_var} >= {self.x_min} && {x_var} <= {self.x_max} && {y_var} >= {self.y_min} && {y_var} <= {self.y_max}"
+        )
+        self._bin_counts = (int((self.x_max - self.x_min) / self.bin_width),
+                            int((self.y_max - self.y_min) / self.bin_width))
     
     def _determine_axis_config(self):
         """Determine the axis configuration based on provided coordinates"""
-        coords = []
+        # An axis counts when both its bounds are given; the first two in x, y, z order
+        # become the plot axes (order matters!)
+        have_x = self.xl is not None and self.xh is not None
+        have_y = self.yl is not None and self.yh is not None
+        have_z = self.zl is not None and self.zh is not None
         
-        # Check which coordinates are provided and preserve the order
-        # We need to check the order as they would appear in the YAML
-        # The order in the dataclass field definition determines the order
-        if self.xl is not None and self.xh is not None:
-            coords.append(('x', self.xl, self.xh))
-        if self.yl is not None and self.yh is not None:
-            coords.append(('y', self.yl, self.yh))
-        if self.zl is not None and self.zh is not None:
-            coords.append(('z', self.zl, self.zh))
-        
-        if len(coords) < 2:
-            # Fallback to default x vs y if not enough coordinates provided
+        if have_x + have_y + have_z < 2:
+            # Fallback to default x vs y, keeping any bound that was provided
             if self.xl is None:
                 self.xl = -250
             if self.xh is None:
@@ -71,26 +92,39 @@ class SurfaceConfig:
                 self.yl = -250
             if self.yh is None:
                 self.yh = 250
-            coords = [('x', self.xl, self.xh), ('y', self.yl, self.yh)]
-        
-        # Set the first two coordinates as x and y axes (order matters!)
-        self.x_axis = coords[0][0]
-        self.y_axis = coords[1][0]
-        self.x_min = coords[0][1]
-        self.x_max = coords[0][2]
-        self.y_min = coords[1][1]
-        self.y_max = coords[1][2]
+            self.x_axis, self.y_axis = 'x', 'y'
+            self.x_min, self.x_max, self.y_min, self.y_max = self.xl, self.xh, self.yl, self.yh
+        elif have_x:
+            self.x_axis, self.x_min, self.x_max = 'x', self.xl, self.xh
+            if have_y:
+                self.y_axis, self.y_min, self.y_max = 'y', self.yl, self.yh
+            else:
+                self.y_axis, self.y_min, self.y_max = 'z', self.zl, self.zh
+        else:
+            self.x_axis, self.x_min, self.x_max = 'y', self.yl, self.yh
+            self.y_axis, self.y_min, self.y_max = 'z', self.zl, self.zh
     
     def get_axis_variables(self):
         """Get the ROOT variable names for the configured axes"""
-        axis_map = {'x': 'Vx', 'y': 'Vy', 'z': 'Vz'}
-        return axis_map[self.x_axis], axis_map[self.y_axis]
+        return self._axis_variables
     
     def get_axis_labels(self):
         """Get the axis labels for the configured axes"""
-        return f"{self.x_axis} [cm]", f"{self.y_axis} [cm]"
+        return self._axis_labels
+    
+    def get_filter_expression(self) -> str:
+        """Get the ROOT filter selecting this surface"""
+        return self._filter_expr
+    
+    def get_spatial_filter_expression(self) -> str:
+        """Get the ROOT filter restricting hits to the configured surface size"""
+        return self._spatial_filter_expr
+    
+    def get_bin_counts(self) -> Tuple[int, int]:
+        """Get the number of spatial bins along the configured axes"""
+        return self._bin_counts
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class BoxSurfaceConfig:
     name: str
     surface_id: int
@@ -102,43 +136,63 @@ class BoxSurfaceConfig:
     zmax: float
     bin_width: float = 0.5
     spatial_analysis: bool = True
-    def get_face_configs(self) -> Dict[str, Dict[str, Any]]:
-        faces = {
-            "front_face": {"condition": f"Vz == {self.zmin}", "x_var": "Vx", "y_var": "Vy", "x_range": (self.xmin, self.xmax), "y_range": (self.ymin, self.ymax)},
-            "back_face": {"condition": f"Vz == {self.zmax}", "x_var": "Vx", "y_var": "Vy", "x_range": (self.xmin, self.xmax), "y_range": (self.ymin, self.ymax)},
-            "right_face": {"condition": f"Vx == {self.xmax}", "x_var": "Vz", "y_var": "Vy", "x_range": (self.zmin, self.zmax), "y_range": (self.ymin, self.ymax)},
-            "left_face": {"condition": f"Vx == {self.xmin}", "x_var": "Vz", "y_var": "Vy", "x_range": (self.zmin, self.zmax), "y_range": (self.ymin, self.ymax)},
-            "top_face": {"condition": f"Vy == {self.ymax}", "x_var": "Vz", "y_var": "Vx", "x_range": (self.zmin, self.zmax), "y_range": (self.xmin, self.xmax)},
-            "bottom_face": {"condition": f"Vy == {self.ymin}", "x_var": "Vz", "y_var": "Vx", "x_range": (self.zmin, self.zmax), "y_range": (self.xmin, self.xmax)}
+    _face_configs: Dict[str, Dict[str, Any]] = field(init=False, repr=False, compare=False)
+    _filter_expr: str = field(init=False, repr=False, compare=False)
+    _face_params: Dict[str, Tuple[int, int, float, float, float, float, str, str]] = field(init=False, repr=False, compare=False)
+    def __post_init__(self):
+        self._filter_expr = sys.intern(f"SurfaceID == {self.surface_id}")
+        # Face definitions only depend on the box bounds, build them once
+        self._face_configs = {
+            face_name: {"condition": sys.intern(condition), "x_var": sys.intern(x_var), "y_var": sys.intern(y_var),
+                        "x_range": x_range, "y_range": y_range}
+            for face_name, condition, x_var, y_var, x_range, y_range in (
+                ("front_face", f"Vz == {self.zmin}", "Vx", "Vy", (self.xmin, self.xmax), (self.ymin, self.ymax)),
+                ("back_face", f"Vz == {self.zmax}", "Vx", "Vy", (self.xmin, self.xmax), (self.ymin, self.ymax)),
+                ("right_face", f"Vx == {self.xmax}", "Vz", "Vy", (self.zmin, self.zmax), (self.ymin, self.ymax)),
+                ("left_face", f"Vx == {self.xmin}", "Vz", "Vy", (self.zmin, self.zmax), (self.ymin, self.ymax)),
+                ("top_face", f"Vy == {self.ymax}", "Vz", "Vx", (self.zmin, self.zmax), (self.xmin, self.xmax)),
+                ("bottom_face", f"Vy == {self.ymin}", "Vz", "Vx", (self.zmin, self.zmax), (self.xmin, self.xmax)),
+            )
+        }
+        # (x_bins, y_bins, xlow, xhigh, ylow, yhigh, x_var, y_var) per face for the 2D bookings
+        self._face_params = {
+            face_name: (int((face["x_range"][1] - face["x_range"][0]) / self.bin_width),
+                        int((face["y_range"][1] - face["y_range"][0]) / self.bin_width),
+                        face["x_range"][0], face["x_range"][1], face["y_range"][0], face["y_range"][1],
+                        face["x_var"], face["y_var"])
+            for face_name, face in self._face_configs.items()
         }
-        return faces
+    def get_face_configs(self) -> Dict[str, Dict[str, Any]]:
+        return self._face_configs
+    def get_filter_expression(self) -> str:
+        return self._filter_expr
     def get_histogram_params(self, face_name: str) -> Tuple[int, int, float, float, float, float, str, str]:
-        face_config = self.get_face_configs()[face_name]
-        x_range = face_config["x_range"]
-        y_range = face_config["y_range"]
-        x_bins = int((x_range[1] - x_range[0]) / self.bin_width)
-        y_bins = int((y_range[1] - y_range[0]) / self.bin_width)
-        return (x_bins, y_bins, x_range[0], x_range[1], y_range[0], y_range[1], face_config["x_var"], face_config["y_var"])
+        return self._face_params[face_name]
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class HistogramConfig:
     n_bins: int
     min_energy: float
     max_energy: float
     also_log_bins: bool = False
-    @property
-    def log_bins(self):
+    _log_bins: Optional[np.ndarray] = field(init=False, repr=False, compare=False)
+    def __post_init__(self):
+        # Log bin edges (n_bins + 1) are computed once and shared by every surface booking.
+        # Linear histograms are booked with (n_bins, min, max) directly, so no edges are needed.
         if self.also_log_bins:
-            return np.logspace(np.log10(self.min_energy), np.log10(self.max_energy), self.n_bins + 1)
+            self._log_bins = np.geomspace(self.min_energy, self.max_energy, self.n_bins + 1)
         else:
-            return np.linspace(self.min_energy, self.max_energy, self.n_bins)
+            self._log_bins = None
+    @property
+    def log_bins(self):
+        return self._log_bins
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class NewVariableConfig:
     name: str
     expression: str
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class Variable2DConfig:
     x_variable: str
     y_variable: str
@@ -160,32 +214,41 @@ class Variable2DConfig:
         if not self.title:
             self.title = f"{self.y_variable} vs {self.x_variable}"
 
-@dataclass
+# Particle ID sets larger than this are filtered with bdx_in_sorted instead of an || chain
+_MAX_CHAINED_IDS = 8
+
+@dataclass(**_DATACLASS_OPTIONS)
 class ParticleConfig:
     particle_id: Union[int, List[int]] = 11
     name: str = "mu_plus"
     variable: str = "P"
     weight: str = "Weight1"
-    def get_particle_ids(self) -> List[int]:
-        if isinstance(self.particle_id, list):
-            return self.particle_id
+    _ids: Tuple[int, ...] = field(init=False, repr=False, compare=False)
+    _filter_expr: str = field(init=False, repr=False, compare=False)
+    def __post_init__(self):
+        # IDs and the filter expression are fixed per config, compute them once
+        self._ids = tuple(self.particle_id) if isinstance(self.particle_id, list) else (self.particle_id,)
+        if len(self._ids) <= _MAX_CHAINED_IDS:
+            expr = "ParticleID == " + " || ParticleID == ".join(str(pid) for pid in self._ids)
         else:
-            return [self.particle_id]
+            # Binary search over a sorted list instead of a long || chain (helper declared in setup_root)
+            values = ", ".join(str(pid) for pid in sorted(set(self._ids)))
+            expr = f"bdx_in_sorted(ParticleID, {{{values}}})"
+        self._filter_expr = sys.intern(expr)
+    def get_particle_ids(self) -> Tuple[int, ...]:
+        return self._ids
     def get_filter_expression(self) -> str:
-        ids = self.get_particle_ids()
-        if len(ids) == 1:
-            return f"ParticleID == {ids[0]}"
-        else:
-            conditions = [f"ParticleID == {pid}" for pid in ids]
-            return " || ".join(conditions)
+        return self._filter_expr
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class OutputConfig:
     base_name: str = "analysis"
     directory: str = "."
     include_timestamp: bool = False
     format_template: str = "{base_name}_{particle_name}_{n_bins}bins_{min_energy}_{max_energy}.root"
     def get_filename(self, particle_config: ParticleConfig, hist_config: HistogramConfig) -> str:
+        # Imported here so loading a config does not pull in ROOT through utils
+        from utils import format_energy
         filename = self.format_template.format(
             base_name=self.base_name,
             particle_name=particle_config.name,
@@ -194,12 +257,35 @@ class OutputConfig:
             max_energy=format_energy(hist_config.max_energy)
         )
         if self.include_timestamp:
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            from datetime import datetime
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             name_parts = filename.rsplit('.', 1)
             filename = f"{name_parts[0]}_{timestamp}.{name_parts[1]}"
-        return str(Path(self.directory) / filename)
+        return os.path.join(self.directory, filename)
 
-@dataclass
+# (config key, section class, whether the key holds a list of sections)
+_SECTIONS = (
+    ('particle', ParticleConfig, False),
+    ('surfaces', SurfaceConfig, True),
+    ('histograms', HistogramConfig, True),
+    ('output', OutputConfig, False),
+    ('box_surfaces', BoxSurfaceConfig, True),
+    ('new_variable', NewVariableConfig, False),
+    ('new_variables', NewVariableConfig, True),
+    ('variable_2d', Variable2DConfig, False),
+    ('comparisons', ComparisonConfig, True),
+)
+# Single sections built with defaults when missing (the others become None)
+_DEFAULT_SECTIONS = {'particle', 'output'}
+
+def _load_yaml(config_path: Path) -> Any:
+    """Load a YAML file, with the libyaml-backed loader when PyYAML was built with it."""
+    import yaml
+    with open(config_path, 'r') as f:
+        loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        return yaml.load(f, Loader=loader)
+
+@dataclass(**_DATACLASS_OPTIONS)
 class AnalysisConfig:
     input_directory: str = ""
     particle: ParticleConfig = field(default_factory=ParticleConfig)
@@ -213,58 +299,21 @@ class AnalysisConfig:
     comparisons: List[ComparisonConfig] = field(default_factory=list)
     @classmethod
     def from_file(cls, config_path: Union[str, Path]) -> 'AnalysisConfig':
-        import yaml, json
+        import json
         config_path = Path(config_path)
-        with open(config_path, 'r') as f:
-            if config_path.suffix.lower() in ['.yaml', '.yml']:
-                config_data = yaml.safe_load(f)
-            else:
+        if config_path.suffix.lower() in ['.yaml', '.yml']:
+            config_data = _load_yaml(config_path)
+        else:
+            with open(config_path, 'r') as f:
                 config_data = json.load(f)
         if not isinstance(config_data, dict):
             raise ValueError("Configuration file must contain a JSON object or YAML mapping")
-        particle_data = config_data.get('particle', {})
-        if particle_data:
-            config_data['particle'] = ParticleConfig(**particle_data)
-        else:
-            config_data['particle'] = ParticleConfig()
-        surfaces_data = config_data.get('surfaces', [])
-        if surfaces_data:
-            config_data['surfaces'] = [SurfaceConfig(**surf) for surf in surfaces_data]
-        else:
-            config_data['surfaces'] = []
-        histograms_data = config_data.get('histograms', [])
-        if histograms_data:
-            config_data['histograms'] = [HistogramConfig(**hist) for hist in histograms_data]
-        else:
-            config_data['histograms'] = []
-        output_data = config_data.get('output', {})
-        if output_data:
-            config_data['output'] = OutputConfig(**output_data)
-        else:
-            config_data['output'] = OutputConfig()
-        box_surfaces_data = config_data.get('box_surfaces', [])
-        if box_surfaces_data:
-            config_data['box_surfaces'] = [BoxSurfaceConfig(**box_surf) for box_surf in box_surfaces_data]
-        else:
-            config_data['box_surfaces'] = []
-        new_variable_data = config_data.get('new_variable', None)
-        if new_variable_data:
-            config_data['new_variable'] = NewVariableConfig(**new_variable_data)
-        else:
-            config_data['new_variable'] = None
-        new_variables_data = config_data.get('new_variables', [])
-        if new_variables_data:
-            config_data['new_variables'] = [NewVariableConfig(**var) for var in new_variables_data]
-        else:
-            config_data['new_variables'] = []
-        variable_2d_data = config_data.get('variable_2d', None)
-        if variable_2d_data:
-            config_data['variable_2d'] = Variable2DConfig(**variable_2d_data)
-        else:
-            config_data['variable_2d'] = None
-        comparisons_data = config_data.get('comparisons', [])
-        if comparisons_data:
-            config_data['comparisons'] = [ComparisonConfig(**cmp) for cmp in comparisons_data]
-        else:
-            config_data['comparisons'] = []
+        for key, section_cls, is_list in _SECTIONS:
+            raw = config_data.get(key)
+            if is_list:
+                config_data[key] = [section_cls(**item) for item in raw] if raw else []
+            elif raw:
+                config_data[key] = section_cls(**raw)
+            else:
+                config_data[key] = section_cls() if key in _DEFAULT_SECTIONS else None
         return cls(**config_data)
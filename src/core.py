@@ -1,3 +1,5 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import ROOT
 from ROOT import RDataFrame
 from pathlib import Path
@@ -7,6 +9,12 @@ from utils import setup_root, format_energy
 from histogram import HistogramSet
 from comparison import compare_histograms_overlay
 
+def _run_comparison(cmp, output_dir, verbose):
+    """Process-pool worker: draw one comparison with its own ROOT state"""
+    setup_root()
+    compare_histograms_overlay(cmp, output_dir=output_dir, verbose=verbose)
+    return cmp.output
+
 class Analysis:
     def write_histograms(self, output_file, histograms):
         """Write histograms to ROOT file"""
@@ -24,9 +32,15 @@ class Analysis:
             if hist_set.h_vertex is not None:
                 hist_set.h_vertex.Scale(1/self.EOT)
                 hist_set.h_vertex.Write()
-    def __init__(self, config: AnalysisConfig, save_macro: bool = False):
+    def __init__(self, config: AnalysisConfig, save_macro: bool = False, combine_comparisons: bool = False,
+                 verbose: bool = True, comparison_jobs: int = 1):
         self.config = config
+        # Worker processes for independent comparisons (opt-in: each one imports ROOT again
+        # and starts its own implicit-MT pool, on top of any --config-dir workers)
+        self.comparison_jobs = max(1, comparison_jobs or 1)
         self.save_macro = save_macro
+        self.combine_comparisons = combine_comparisons
+        self.verbose = verbose
         self.comparison_only = (
             (not config.histograms)
             and (not config.surfaces)
@@ -43,15 +57,23 @@ class Analysis:
             output_dir.mkdir(parents=True, exist_ok=True)
             summary_file_path = output_dir / "simulation_summary.root"
             if summary_file_path.exists():
-                print(f"Reading EOT from existing summary file: {summary_file_path}")
-                self.EOT = SimulationSummary.read_eot_from_file(str(summary_file_path))
+                # The JSON sidecar avoids opening the ROOT file just to read one number
+                eot = SimulationSummary.read_eot_from_sidecar(str(summary_file_path))
+                if eot is not None:
+                    print(f"Reading EOT from summary sidecar: {SimulationSummary.eot_sidecar_path(str(summary_file_path))}")
+                    self.EOT = eot
+                else:
+                    print(f"Reading EOT from existing summary file: {summary_file_path}")
+                    self.EOT = SimulationSummary.read_eot_from_file(str(summary_file_path))
+                    SimulationSummary.write_eot_sidecar(str(summary_file_path), self.EOT)
             else:
                 print(f"Creating new simulation summary file: {summary_file_path}")
                 summary_file = ROOT.TFile(str(summary_file_path), "RECREATE")
                 RSummary = RDataFrame("RunSummary", self.root_dir)
                 summary = SimulationSummary(RSummary)
-                self.EOT = summary.process_summary(summary_file)
+                self.EOT = summary.process_summary(summary_file).EOT
                 summary_file.Close()
+                SimulationSummary.write_eot_sidecar(str(summary_file_path), self.EOT)
 
     def setup_root(self):
         self.set_style, self.stileh1, self.stileh2, self.quiet = setup_root()
@@ -60,16 +82,40 @@ class Analysis:
         if not self.config.comparisons:
             return
         print(f"\nProcessing {len(self.config.comparisons)} histogram comparisons...")
+        # Use default output directory only if comparison doesn't specify its own
+        default_output_dir = getattr(self.config, 'output', None)
+        default_output_dir = getattr(default_output_dir, 'directory', None) if default_output_dir else None
+        multipage_pdf = None
+        if self.combine_comparisons:
+            # All comparison plots go to one multi-page PDF in the output directory
+            pdf_dir = Path(default_output_dir or '.')
+            pdf_dir.mkdir(parents=True, exist_ok=True)
+            multipage_pdf = str(pdf_dir / "comparisons.pdf")
+            pdf_canvas = ROOT.TCanvas("c_comparisons_pdf", "", 700, 600)
+            pdf_canvas.Print(f"{multipage_pdf}[")
         for cmp in self.config.comparisons:
-            # Propagate save_macro flag from analysis CLI into comparison config dynamically
-            try:
-                setattr(cmp, 'save_macro', bool(self.save_macro))
-            except Exception:
-                pass
-            # Use default output directory only if comparison doesn't specify its own
-            default_output_dir = getattr(self.config, 'output', None)
-            default_output_dir = getattr(default_output_dir, 'directory', None) if default_output_dir else None
-            compare_histograms_overlay(cmp, output_dir=default_output_dir)
+            # Propagate save_macro flag from analysis CLI into comparison config
+            cmp.save_macro = bool(self.save_macro)
+        n_jobs = min(self.comparison_jobs, len(self.config.comparisons))
+        try:
+            if n_jobs > 1 and not multipage_pdf:
+                # Comparisons read their own files and draw their own canvas, so they run in
+                # separate processes (spawned: ROOT's global state does not survive fork)
+                with ProcessPoolExecutor(max_workers=n_jobs,
+                                         mp_context=multiprocessing.get_context("spawn")) as executor:
+                    futures = [executor.submit(_run_comparison, cmp, default_output_dir, self.verbose)
+                               for cmp in self.config.comparisons]
+                    for future in futures:
+                        future.result()
+            else:
+                # Pages of a combined PDF must be printed in order from this process
+                for cmp in self.config.comparisons:
+                    compare_histograms_overlay(cmp, output_dir=default_output_dir, multipage_pdf=multipage_pdf,
+                                               verbose=self.verbose)
+        finally:
+            if multipage_pdf:
+                pdf_canvas.Print(f"{multipage_pdf}]")
+                print(f"Saved combined comparison plots: {multipage_pdf}")
 
     def process_all_configs(self):
         if self.comparison_only:
@@ -78,6 +124,16 @@ class Analysis:
         print(f"\nProcessing {self.config.particle.name} analysis...")
         print(f"Input directory: {self.config.input_directory}")
         print(f"Number of histogram configurations: {len(self.config.histograms)}")
+        # A single DataFrame serves every hist_config: all bookings are lazy, so the
+        # input files are scanned in one event loop triggered by the first write
+        REvents = RDataFrame("Events", self.root_dir)
+        # Define the configured new variables once on the base DataFrame
+        REvents = self._add_new_variables(REvents)
+        # The particle/surface filters do not depend on the hist_config: build the chains once
+        # so that each filter is evaluated once per event, not once per hist_config
+        print("Creating filters...")
+        filters = self._create_filters(REvents)
+        booked = []
         for hist_config in self.config.histograms:
             print(f"\nProcessing histogram configuration:")
             print(f"  Number of bins: {hist_config.n_bins}")
@@ -85,19 +141,18 @@ class Analysis:
             print(f"  Log bins: {hist_config.also_log_bins}")
             output_filename = self.config.output.get_filename(self.config.particle, hist_config)
             print(f"  Output file: {output_filename}")
-            REvents = RDataFrame("Events", self.root_dir)
+            histograms = self.create_histograms(filters, hist_config)
+            booked.append((output_filename, histograms))
+        for output_filename, histograms in booked:
             output_file = ROOT.TFile(output_filename, "RECREATE")
-            histograms = self.create_histograms(REvents, hist_config)
             print(f"  Writing histograms to {output_filename}...")
             self.write_histograms(output_file, histograms)
             output_file.Close()
             print(f"  Completed: {output_filename}")
         self.process_comparisons()
 
-    def create_histograms(self, REvents, hist_config):
-        """Create histograms for a given configuration"""
-        print("  Creating filters...")
-        filters = self._create_filters(REvents)
+    def create_histograms(self, filters, hist_config):
+        """Create histograms for a given configuration on the shared filters (see _create_filters)"""
         print("  Creating histograms...")
         histograms = self._create_histograms(filters, hist_config)
         return histograms
@@ -121,17 +176,14 @@ class Analysis:
 
     def _create_filters(self, REvents):
         """Create all filters based on configuration"""
-        # First, create any new variables that are defined in the configuration
-        df = self._add_new_variables(REvents)
-        
-        particle_filter = df.Filter(self.config.particle.get_filter_expression())
+        particle_filter = REvents.Filter(self.config.particle.get_filter_expression())
         surface_filters = {}
         for surface in getattr(self.config, 'surfaces', []):
-            surf_filter = particle_filter.Filter(f"SurfaceID == {surface.id}")
+            surf_filter = particle_filter.Filter(surface.get_filter_expression())
             surface_filters[surface.id] = surf_filter
         box_filters = {}
         for box_surface in getattr(self.config, 'box_surfaces', []):
-            box_filter = particle_filter.Filter(f"SurfaceID == {box_surface.surface_id}")
+            box_filter = particle_filter.Filter(box_surface.get_filter_expression())
             face_configs = box_surface.get_face_configs()
             box_filters[box_surface.name] = {
                 face_name: box_filter.Filter(face_config["condition"])
@@ -145,84 +197,89 @@ class Analysis:
 
     def _create_histograms(self, filters, hist_config):
         """Create histograms using the filters"""
-        from histogram import HistogramSet
         histograms = []
+        # Bind the per-call constants once, they are used by every booking below
+        particle = self.config.particle
+        pname, pvar, pweight = particle.name, particle.variable, particle.weight
+        n_bins, emin, emax = hist_config.n_bins, hist_config.min_energy, hist_config.max_energy
+        log_edges = hist_config.log_bins if hist_config.also_log_bins else None
+        set_style, stileh1, stileh2 = self.set_style, self.stileh1, self.stileh2
+        title_1d = f"; {pvar} [GeV]; n/(GeV * EOT)"
+        # The energy cut only depends on the hist_config, build it once for all surfaces
+        energy_cut = f"{pvar} >= {emin} && {pvar} <= {emax}"
         # Regular surfaces
         for surface in filters['surfaces']:
             if surface.id in filters['surface_filters']:
                 print(f"  Processing surface {surface.name} (ID: {surface.id})")
                 surf_filter = filters['surface_filters'][surface.id]
-                energy_filtered = surf_filter.Filter(
-                    f"{self.config.particle.variable} >= {hist_config.min_energy} && {self.config.particle.variable} <= {hist_config.max_energy}"
-                )
                 # Get flexible axis configuration
                 x_var, y_var = surface.get_axis_variables()
-                # Apply spatial bounds for 1D histograms using configured surface size
-                spatial_filtered_for_1d = energy_filtered.Filter(
-                    f"{x_var} >= {surface.x_min} && {x_var} <= {surface.x_max} && {y_var} >= {surface.y_min} && {y_var} <= {surface.y_max}"
+                # Energy and spatial bounds (configured surface size) fused into one filter node for 1D histograms
+                spatial_filtered_for_1d = surf_filter.Filter(
+                    f"{energy_cut} && {surface.get_spatial_filter_expression()}"
                 )
                 x_label, y_label = surface.get_axis_labels()
-                nbins_x = int((surface.x_max - surface.x_min) / surface.bin_width)
-                nbins_y = int((surface.y_max - surface.y_min) / surface.bin_width)
-                with self.set_style(self.stileh1):
-                    if hist_config.also_log_bins:
+                nbins_x, nbins_y = surface.get_bin_counts()
+                with set_style(stileh1):
+                    if log_edges is not None:
                         h_log = spatial_filtered_for_1d.Histo1D(
-                            (f"{self.config.particle.name}_h1_{surface.name}_log",
-                             f"; {self.config.particle.variable} [GeV]; n/(GeV * EOT)",
-                             hist_config.n_bins, hist_config.log_bins),
-                            self.config.particle.variable, self.config.particle.weight)
+                            (f"{pname}_h1_{surface.name}_log",
+                             title_1d,
+                             n_bins, log_edges),
+                            pvar, pweight)
                     else:
                         h_log = None  # Don't create log histogram when also_log_bins is False
                     h_lin = spatial_filtered_for_1d.Histo1D(
-                        (f"{self.config.particle.name}_h1_{surface.name}_lin",
-                         f"; {self.config.particle.variable} [GeV]; n/(GeV * EOT)",
-                         hist_config.n_bins, hist_config.min_energy, hist_config.max_energy),
-                        self.config.particle.variable, self.config.particle.weight)
-                with self.set_style(self.stileh2):
+                        (f"{pname}_h1_{surface.name}_lin",
+                         title_1d,
+                         n_bins, emin, emax),
+                        pvar, pweight)
+                with set_style(stileh2):
                     surface_name = surface.name or f"surf_{surface.id}"
                     if surface.spatial_analysis:
+                        # Spatial range is enforced by the 2D binning, only the energy cut is needed
+                        energy_filtered = surf_filter.Filter(energy_cut)
                         h_vertex = energy_filtered.Histo2D(
-                            (f"{self.config.particle.name}_h2_{surface_name}",
+                            (f"{pname}_h2_{surface_name}",
                              f"; {x_label}; {y_label}; n/(EOT)",
                              nbins_x, surface.x_min, surface.x_max, nbins_y, surface.y_min, surface.y_max),
-                            x_var, y_var, self.config.particle.weight)
+                            x_var, y_var, pweight)
                     else:
                         h_vertex = None  # Don't create spatial histogram when spatial_analysis is False
                 histograms.append(HistogramSet(surface_name, h_log, h_lin, h_vertex))
         # Box surfaces
         if "box_filters" in filters:
+            box_surfaces = {bs.name: bs for bs in getattr(self.config, 'box_surfaces', [])}
             for box_name, face_filters in filters["box_filters"].items():
                 print(f"  Processing box surface: {box_name}")
-                box_surface = next((bs for bs in getattr(self.config, 'box_surfaces', []) if bs.name == box_name), None)
+                box_surface = box_surfaces.get(box_name)
                 if not box_surface:
                     continue
                 for face_name, face_filter in face_filters.items():
-                    energy_filtered_face = face_filter.Filter(
-                        f"{self.config.particle.variable} >= {hist_config.min_energy} && {self.config.particle.variable} <= {hist_config.max_energy}"
-                    )
-                    with self.set_style(self.stileh1):
-                        if hist_config.also_log_bins:
+                    energy_filtered_face = face_filter.Filter(energy_cut)
+                    with set_style(stileh1):
+                        if log_edges is not None:
                             h_log = energy_filtered_face.Histo1D(
-                                (f"{self.config.particle.name}_h1_{box_name}_{face_name}_log",
-                                 f"; {self.config.particle.variable} [GeV]; n/(GeV * EOT)",
-                                 hist_config.n_bins, hist_config.log_bins),
-                                self.config.particle.variable, self.config.particle.weight)
+                                (f"{pname}_h1_{box_name}_{face_name}_log",
+                                 title_1d,
+                                 n_bins, log_edges),
+                                pvar, pweight)
                         else:
                             h_log = None  # Don't create log histogram when also_log_bins is False
                         h_lin = energy_filtered_face.Histo1D(
-                            (f"{self.config.particle.name}_h1_{box_name}_{face_name}_lin",
-                             f"; {self.config.particle.variable} [GeV]; n/(GeV * EOT)",
-                             hist_config.n_bins, hist_config.min_energy, hist_config.max_energy),
-                            self.config.particle.variable, self.config.particle.weight)
-                    with self.set_style(self.stileh2):
+                            (f"{pname}_h1_{box_name}_{face_name}_lin",
+                             title_1d,
+                             n_bins, emin, emax),
+                            pvar, pweight)
+                    with set_style(stileh2):
                         if box_surface.spatial_analysis:
                             x_bins, y_bins, xlow, xhigh, ylow, yhigh, x_dim, y_dim = \
                                 box_surface.get_histogram_params(face_name)
                             h_vertex = energy_filtered_face.Histo2D(
-                                (f"{self.config.particle.name}_h2_{box_name}_{face_name}",
+                                (f"{pname}_h2_{box_name}_{face_name}",
                                  f"; {x_dim} [cm]; {y_dim} [cm]; n/(EOT)",
                                  x_bins, xlow, xhigh, y_bins, ylow, yhigh),
-                                x_dim, y_dim, self.config.particle.weight)
+                                x_dim, y_dim, pweight)
                         else:
                             h_vertex = None  # Don't create spatial histogram when spatial_analysis is False
                     histograms.append(HistogramSet(f"{box_name}_{face_name}", h_log, h_lin, h_vertex))
@@ -7,21 +7,135 @@ with organized naming schemes and directory structures.
 
 import ctypes
 import glob
+import multiprocessing
+import os
 import re
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Tuple, List
 import csv
+import numpy as np
 import ROOT
 from utils import setup_root
 from simulation_summary import SimulationSummary
 
+try:
+    import uproot
+    HAS_UPROOT = True
+except ImportError:
+    HAS_UPROOT = False
+
+# {N}bins_{min_energy}_{max_energy} part of analysis filenames
+_BINNING_ENERGY_RE = re.compile(r'(\d+bins_[\d.]+\w+_[\d.]+\w+)')
+# Adjacent {min_energy}_{max_energy} tokens as written by format_energy (e.g. 0.1eV_6.0GeV)
+_ENERGY_PAIR_RE = re.compile(r'(?<![\d.])(\d+(?:\.\d+)?[kMG]?eV)_(\d+(?:\.\d+)?[kMG]?eV)')
+
+
+@lru_cache(maxsize=None)
+def _binning_energy_from_stem(file_stem: str) -> str:
+    """Parse (and memoize) the binning/energy token of a ROOT filename stem"""
+    match = _BINNING_ENERGY_RE.search(file_stem)
+    if match:
+        return match.group(1)
+    # Fallback: try to extract just the part after the particle name
+    parts = file_stem.split('_')
+    if len(parts) >= 4:
+        # Expect format: analysis_particlename_binning_minE_maxE
+        return '_'.join(parts[2:])  # Return binning_minE_maxE
+    return "unknown"
+
+
+@lru_cache(maxsize=None)
+def _energy_tokens_from_name(file_name: str) -> Optional[Tuple[str, str]]:
+    """Return the (min_energy, max_energy) tokens of an analysis filename, or None"""
+    match = _ENERGY_PAIR_RE.search(file_name)
+    return match.groups() if match else None
+
+
+# Detector part of histogram names: optional "...h1_"/"...h2_" prefix and "_lin"/"_log" suffix stripped
+_DETECTOR_RE = re.compile(r'^(?:.*?h[12]_)?(?P<d>.*?)(?:_lin|_log)?$')
+
+
+def _extract_detector_from_histogram_name(name: str) -> str:
+    """
+    Extract detector identifier from histogram names such as:
+    - neutrons_h1_fl_1000_enclose_lin
+    - neutrons_h2_fl_1000_enclose
+    """
+    match = _DETECTOR_RE.match(name)
+    return match.group('d') if match else "unknown"
+
+
+# Columns of the histogram statistics sheets / CSV
+_STAT_COLUMNS = (
+    "analyzed_file", "detector", "histogram_name", "energy_range",
+    "integral", "error", "error_percent",
+    "xl", "xh", "yl", "yh", "delta_x", "delta_y",
+)
+# Excel named styles (registered once per workbook) and the columns they apply to.
+# error_percent values are not scaled, the format only shows the % sign.
+_STAT_STYLES = {
+    "stat_scientific": '0.00E+00',
+    "stat_percent": '0.00"%"',
+    "stat_fixed": '0.00',
+}
+_STAT_COLUMN_STYLES = {
+    "integral": "stat_scientific",
+    "error": "stat_scientific",
+    "error_percent": "stat_percent",
+    **{dim_col: "stat_fixed" for dim_col in ("xl", "xh", "yl", "yh", "delta_x", "delta_y")},
+}
+
+
+@lru_cache(maxsize=None)
+def _class_inherits_from(class_name: str, base: str) -> bool:
+    """Whether a class (e.g. a TKey's class name) inherits from base, without reading any object"""
+    tclass = ROOT.TClass.GetClass(class_name)
+    return bool(tclass) and bool(tclass.InheritsFrom(base))
+
+
+def _read_eot_or_none(summary_path: str) -> Optional[float]:
+    """EOT of a simulation summary file (cached per file version), or None if missing/unreadable"""
+    try:
+        if os.path.exists(summary_path):
+            return SimulationSummary.read_eot_cached(summary_path)
+    except Exception:
+        pass
+    return None
+
+
+def _width_integral_and_error(hist, is_2d: bool) -> Tuple[float, float, float, float, Optional[float], Optional[float]]:
+    """
+    NumPy equivalent of IntegralAndError(1, N, ..., "width") for an uproot histogram.
+
+    Returns:
+        (integral, error, xl, xh, yl, yh); yl/yh are None for 1D histograms
+    """
+    values = hist.values(flow=False)
+    variances = hist.variances(flow=False)
+    x_edges = hist.axis(0).edges(flow=False)
+    widths = np.diff(x_edges)
+    if is_2d:
+        y_edges = hist.axis(1).edges(flow=False)
+        widths = np.outer(widths, np.diff(y_edges))
+        limits = (float(x_edges[0]), float(x_edges[-1]), float(y_edges[0]), float(y_edges[-1]))
+    else:
+        limits = (float(x_edges[0]), float(x_edges[-1]), None, None)
+    integral = float(np.sum(values * widths))
+    error = float(np.sqrt(np.sum(variances * widths * widths)))
+    return (integral, error) + limits
+
 
 class Exporter:
     """
     Class to handle export of ROOT histograms with organized file structure.
     """
     
-    def __init__(self, style_env: Optional[Tuple] = None, verbose: bool = True, save_macro: bool = False):
+    def __init__(self, style_env: Optional[Tuple] = None, verbose: bool = True, save_macro: bool = False,
+                 multipage: bool = False):
         """
         Initialize the exporter.
         
@@ -29,10 +143,19 @@ class Exporter:
             style_env: Style environment tuple (set_style, style_h1, style_h2, quiet) or None
             verbose: Print integral information for 1D 'lin' histograms
             save_macro: Also save each canvas as a ROOT macro (.C)
+            multipage: Write one multi-page PDF per ROOT file instead of one PDF per histogram
         """
         self.verbose = verbose
         self.style_env = style_env
+        # Worker processes set up their own default style, so a custom one forces serial export
+        self.custom_style = style_env is not None
         self.save_macro = save_macro
+        self.multipage = multipage
+        
+        # Canvases never need a display, and histograms read from files are not registered in
+        # the file directory (their Python wrappers own them, see the ReadObj calls below)
+        ROOT.gROOT.SetBatch(True)
+        ROOT.TH1.AddDirectory(False)
         
         # Setup style environment if not provided
         if self.style_env is None:
@@ -54,7 +177,8 @@ class Exporter:
         self._export_histograms_from_file(Path(root_file_path), output_dir=output_dir, name_prefix="", indent_print="")
     
     def export_all_analysis_files(self, output_dir: str, particle_name: Optional[str] = None, 
-                                 energy_ranges: Optional[List[Tuple[float, float]]] = None) -> None:
+                                 energy_ranges: Optional[List[Tuple[float, float]]] = None,
+                                 jobs: int = 1) -> None:
         """
         Export all histograms from multiple analysis ROOT files to organized PDF files.
         
@@ -62,6 +186,8 @@ class Exporter:
             output_dir: Output directory containing the ROOT files
             particle_name: Particle name to filter ROOT files (optional)
             energy_ranges: List of (min_energy, max_energy) tuples in GeV for proper ordering
+            jobs: Number of files exported in parallel processes (default: 1, serial;
+                  ignored when a custom style_env was given)
         """
         output_dir = Path(output_dir)
         
@@ -78,21 +204,49 @@ class Exporter:
         print(f"Found {len(root_files)} analysis ROOT files")
         print(f"Exporting histograms to PDF in {plots_dir}")
         
-        # Process each ROOT file
-        for i, root_file_path in enumerate(root_files):
-            print(f"\nProcessing file {i+1}/{len(root_files)}: {root_file_path.name}")
-            
-            # Extract binning and energy range from filename
-            binning_energy_info = self._extract_binning_energy_from_filename(root_file_path.stem)
-            
-            # Create prefix for ordering (00, 01, 02, etc.) + binning/energy info
-            prefix = f"{i:02d}_{binning_energy_info}_"
-            
-            # Process the ROOT file
-            self._export_histograms_from_file(root_file_path, output_dir=str(plots_dir), name_prefix=prefix, indent_print="    ")
+        # Create prefix for ordering (00, 01, 02, etc.) + binning/energy info extracted from the filename
+        prefixes = [f"{i:02d}_{self._extract_binning_energy_from_filename(f.stem)}_" for i, f in enumerate(root_files)]
+        
+        # Optional staging (BDX_STAGE_DIR, e.g. /dev/shm): render into a temporary directory there
+        # and move the finished files into plots/ at the end. Off by default: container tmpfs is
+        # small, and on a local disk the move is only an extra copy.
+        stage_parent = os.getenv("BDX_STAGE_DIR")
+        if stage_parent:
+            with tempfile.TemporaryDirectory(prefix="bdx_plots_", dir=stage_parent) as staging_dir:
+                try:
+                    self._export_files(root_files, prefixes, staging_dir, jobs)
+                finally:
+                    # Move whatever was rendered, also when an export failed midway
+                    with os.scandir(staging_dir) as entries:
+                        for entry in entries:
+                            shutil.move(entry.path, os.path.join(plots_dir, entry.name))
+        else:
+            self._export_files(root_files, prefixes, str(plots_dir), jobs)
         
         print(f"\nCompleted PDF export. All plots saved in: {plots_dir}")
 
+    def _export_files(self, root_files: List[Path], prefixes: List[str], destination_dir: str,
+                      jobs: int) -> None:
+        """Export each ROOT file with its prefix into destination_dir, serially or in worker processes"""
+        n_jobs = 1 if self.custom_style else min(jobs or 1, len(root_files))
+        if n_jobs > 1:
+            # Files are independent: each worker opens its own TFile and writes its own PDFs.
+            # Spawned (not forked) workers so that every process starts with a clean ROOT state.
+            print(f"Exporting {len(root_files)} files with {n_jobs} parallel jobs")
+            with ProcessPoolExecutor(max_workers=n_jobs, mp_context=multiprocessing.get_context("spawn")) as executor:
+                futures = [
+                    executor.submit(_export_file_worker, str(root_file_path), destination_dir, prefix,
+                                    self.verbose, self.save_macro, self.multipage)
+                    for root_file_path, prefix in zip(root_files, prefixes)
+                ]
+                for future in futures:
+                    future.result()
+        else:
+            # Process each ROOT file
+            for i, (root_file_path, prefix) in enumerate(zip(root_files, prefixes)):
+                print(f"\nProcessing file {i+1}/{len(root_files)}: {root_file_path.name}")
+                self._export_histograms_from_file(root_file_path, output_dir=destination_dir, name_prefix=prefix, indent_print="    ")
+
     def export_histogram_statistics(self, output_dir: str,
                                     particle_name: Optional[str] = None,
                                     energy_ranges: Optional[List[Tuple[float, float]]] = None,
@@ -127,231 +281,176 @@ class Exporter:
         energy_rows = {}
         energy_order = []
 
-        def extract_detector_from_histogram_name(name: str) -> str:
-            """
-            Extract detector identifier from histogram names such as:
-            - neutrons_h1_fl_1000_enclose_lin
-            - neutrons_h2_fl_1000_enclose
-            """
-            try:
-                after = name
-                for marker in ("h1_", "h2_"):
-                    if marker in after:
-                        after = after.split(marker, 1)[1]
-                        break
-
-                for suffix in ("_lin", "_log"):
-                    if after.endswith(suffix):
-                        after = after[: -len(suffix)]
-                        break
-                return after
-            except Exception:
-                return "unknown"
-
         # Define integration parameters used below so we can report them in the Notes sheet
         integration_first_bin = 1
         integration_option = "width"  # Passed to IntegralAndError's option argument
-        # Try to read EOT from simulation summary file in the output directory
-        eot_value = None
-        try:
-            summary_path = base_dir / "simulation_summary.root"
-            if summary_path.exists():
-                eot_value = SimulationSummary.read_eot_from_file(str(summary_path))
-        except Exception:
-            eot_value = None
+        # Read EOT from the simulation summary file (cached per file version)
+        eot_value = _read_eot_or_none(str(base_dir / "simulation_summary.root"))
 
         for file_path in sorted_files:
             # Derive energy range label using shared helper
             energy_label = self._derive_energy_label(file_path, energy_ranges)
 
-            root_file = ROOT.TFile(str(file_path), "READ")
-            if not root_file or root_file.IsZombie():
+            stats = self._read_histogram_stats(file_path, integration_first_bin, integration_option)
+            if stats is None:
                 print(f"Warning: Could not open ROOT file: {file_path}")
                 continue
 
+            # detector -> row; a 2D histogram always wins over the 1D 'lin' one of the same detector.
+            # Rows are tuples in _STAT_COLUMNS order, with None for the missing y columns of 1D histograms.
             detector_rows = {}
-            keys = root_file.GetListOfKeys()
-            for key in keys:
-                obj = key.ReadObj()
-                if not obj.InheritsFrom("TH1"):
-                    continue
-
-                hist_name = obj.GetName()
-                detector_name = extract_detector_from_histogram_name(hist_name)
-                is_2d = obj.InheritsFrom("TH2")
+            for hist_name, is_2d, integral, error, xl, xh, yl, yh in stats:
+                detector_name = _extract_detector_from_histogram_name(hist_name)
+                percent_error = (error / integral) * 100 if integral != 0 else 0.0
 
                 if is_2d:
-                    error = ctypes.c_double(0)
-                    last_bin_x = obj.GetNbinsX()
-                    last_bin_y = obj.GetNbinsY()
-                    integral = obj.IntegralAndError(
-                        integration_first_bin,
-                        last_bin_x,
-                        integration_first_bin,
-                        last_bin_y,
-                        error,
-                        integration_option,
+                    detector_rows[detector_name] = (
+                        file_path.name, detector_name, hist_name, energy_label,
+                        integral, error, float(percent_error),
+                        xl, xh, yl, yh, xh - xl, yh - yl,
+                    )
+                elif detector_name not in detector_rows:
+                    detector_rows[detector_name] = (
+                        file_path.name, detector_name, hist_name, energy_label,
+                        integral, error, float(percent_error),
+                        xl, xh, None, None, xh - xl, None,
                     )
-                    percent_error = (error.value / integral) * 100 if integral != 0 else 0.0
-
-                    x_axis = obj.GetXaxis()
-                    y_axis = obj.GetYaxis()
-                    xl = x_axis.GetXmin()
-                    xh = x_axis.GetXmax()
-                    yl = y_axis.GetXmin()
-                    yh = y_axis.GetXmax()
-
-                    detector_rows[detector_name] = {
-                        "priority": 0,
-                        "data": {
-                            "analyzed_file": file_path.name,
-                            "detector": detector_name,
-                            "histogram_name": hist_name,
-                            "energy_range": energy_label,
-                            "integral": float(integral),
-                            "error": float(error.value),
-                            "error_percent": float(percent_error),
-                            "xl": float(xl),
-                            "xh": float(xh),
-                            "yl": float(yl),
-                            "yh": float(yh),
-                            "delta_x": float(xh - xl),
-                            "delta_y": float(yh - yl),
-                        },
-                    }
-                    continue
-
-                if "lin" not in hist_name:
-                    continue
 
-                error = ctypes.c_double(0)
-                last_bin = obj.GetNbinsX()
-                integral = obj.IntegralAndError(
-                    integration_first_bin,
-                    last_bin,
-                    error,
-                    integration_option,
-                )
-                percent_error = (error.value / integral) * 100 if integral != 0 else 0.0
-
-                x_axis = obj.GetXaxis()
-                xl = x_axis.GetXmin()
-                xh = x_axis.GetXmax()
-                yl = yh = None
-                delta_x = xh - xl
-                delta_y = None
-
-                candidate = {
-                    "priority": 1,
-                    "data": {
-                        "analyzed_file": file_path.name,
-                        "detector": detector_name,
-                        "histogram_name": hist_name,
-                        "energy_range": energy_label,
-                        "integral": float(integral),
-                        "error": float(error.value),
-                        "error_percent": float(percent_error),
-                        "xl": float(xl) if xl is not None else None,
-                        "xh": float(xh) if xh is not None else None,
-                        "yl": float(yl) if yl is not None else None,
-                        "yh": float(yh) if yh is not None else None,
-                        "delta_x": float(delta_x) if delta_x is not None else None,
-                        "delta_y": float(delta_y) if delta_y is not None else None,
-                    },
-                }
-
-                existing = detector_rows.get(detector_name)
-                if existing is None or candidate["priority"] < existing["priority"]:
-                    detector_rows[detector_name] = candidate
-
-            for entry in detector_rows.values():
-                row = entry["data"]
-                rows.append(row)
-                energy_label_key = row["energy_range"]
-                if energy_label_key not in energy_rows:
-                    energy_rows[energy_label_key] = []
-                    energy_order.append(energy_label_key)
-                energy_rows[energy_label_key].append(row)
-
-            root_file.Close()
+            if detector_rows:
+                if energy_label not in energy_rows:
+                    energy_rows[energy_label] = []
+                    energy_order.append(energy_label)
+                for row in detector_rows.values():
+                    rows.append(row)
+                    energy_rows[energy_label].append(row)
 
         if not rows:
             print("No matching histograms found for statistics export.")
             return
 
-        # Try Excel via pandas/openpyxl; otherwise fallback to CSV
+        # Notes text with integral description (dynamic by integration params)
+        if eot_value is not None:
+            eot_note = f"scaled by 1/EOT where EOT={eot_value}"
+        else:
+            eot_note = "scaled by 1/EOT"
+        notes_text = (
+            f"Integrals computed with IntegralAndError(first_bin={integration_first_bin}, "
+            f"last_bin=N_bins_x, option=\"{integration_option}\"), {eot_note}."
+        )
+
+        # Try Excel via openpyxl; otherwise fallback to CSV
         excel_path = base_dir / excel_filename
         try:
-            import pandas as pd  # type: ignore
-            columns = [
-                "analyzed_file", "detector", "histogram_name", "energy_range",
-                "integral", "error", "error_percent",
-                "xl", "xh", "yl", "yh", "delta_x", "delta_y"
-            ]
-            with pd.ExcelWriter(excel_path) as writer:
-                for idx, label in enumerate(energy_order):
-                    df = pd.DataFrame(energy_rows[label], columns=columns)
-                    sheet_name = f"{idx:02d}"
-                    df.to_excel(writer, sheet_name=sheet_name, index=False)
-                # Add Notes sheet with integral description (dynamic by integration params)
-                if eot_value is not None:
-                    eot_note = f"scaled by 1/EOT where EOT={eot_value}"
-                else:
-                    eot_note = "scaled by 1/EOT"
-                notes_text = (
-                    f"Integrals computed with IntegralAndError(first_bin={integration_first_bin}, "
-                    f"last_bin=N_bins_x, option=\"{integration_option}\"), {eot_note}."
-                )
-                pd.DataFrame({"Notes": [notes_text]}).to_excel(writer, sheet_name="Notes", index=False, header=False)
-
-            # Apply number formats using openpyxl if available, to each sheet
-            try:
-                import openpyxl  # type: ignore
-                wb = openpyxl.load_workbook(excel_path)
-                sci_format = '0.00E+00'
-                percent_literal_format = '0.00"%"'  # Do not scale values, only show % sign
-                for ws in wb.worksheets:
-                    if ws.title == "Notes":
-                        continue
-                    header_to_col = {}
-                    for col in range(1, ws.max_column + 1):
-                        header = ws.cell(row=1, column=col).value
-                        if isinstance(header, str):
-                            header_to_col[header] = col
-                    for row_idx in range(2, ws.max_row + 1):
-                        if "integral" in header_to_col:
-                            ws.cell(row=row_idx, column=header_to_col["integral"]).number_format = sci_format
-                        if "error" in header_to_col:
-                            ws.cell(row=row_idx, column=header_to_col["error"]).number_format = sci_format
-                        if "error_percent" in header_to_col:
-                            ws.cell(row=row_idx, column=header_to_col["error_percent"]).number_format = percent_literal_format
-                        for dim_col in ["xl", "xh", "yl", "yh", "delta_x", "delta_y"]:
-                            if dim_col in header_to_col:
-                                ws.cell(row=row_idx, column=header_to_col[dim_col]).number_format = '0.00'
-                # Move Notes sheet to the first position
-                if "Notes" in wb.sheetnames:
-                    notes_ws = wb["Notes"]
-                    wb._sheets.remove(notes_ws)
-                    wb._sheets.insert(0, notes_ws)
-                wb.save(excel_path)
-            except Exception:
-                # If formatting fails, leave the file as written
-                pass
+            from openpyxl import Workbook  # type: ignore
+            from openpyxl.cell import WriteOnlyCell  # type: ignore
+            from openpyxl.styles import NamedStyle  # type: ignore
+
+            # Write-only workbook: rows are streamed to disk with their number formats,
+            # so the file is never re-opened for formatting
+            wb = Workbook(write_only=True)
+            for style_name, number_format in _STAT_STYLES.items():
+                wb.add_named_style(NamedStyle(name=style_name, number_format=number_format))
+            column_styles = [_STAT_COLUMN_STYLES.get(column) for column in _STAT_COLUMNS]
+            notes_ws = wb.create_sheet("Notes")  # Notes sheet in the first position
+            notes_ws.append([notes_text])
+            for idx, label in enumerate(energy_order):
+                ws = wb.create_sheet(f"{idx:02d}")
+                ws.append(_STAT_COLUMNS)
+                for row in energy_rows[label]:
+                    cells = []
+                    for value, style_name in zip(row, column_styles):
+                        if style_name is None or value is None:
+                            cells.append(value)
+                        else:
+                            cell = WriteOnlyCell(ws, value=value)
+                            cell.style = style_name
+                            cells.append(cell)
+                    ws.append(cells)
+            wb.save(excel_path)
 
             print(f"Histogram statistics saved to: {excel_path}")
         except Exception as exc:
             # Fallback to CSV
             csv_path = excel_path.with_suffix('.csv')
-            with open(csv_path, mode='w', newline='') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=[
-                    "analyzed_file", "detector", "histogram_name", "energy_range",
-                    "integral", "error", "error_percent",
-                    "xl", "xh", "yl", "yh", "delta_x", "delta_y"
-                ])
-                writer.writeheader()
+            # 1 MiB buffer: rows are flushed in large blocks instead of ~8 KiB chunks
+            with open(csv_path, mode='w', newline='', buffering=1 << 20) as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(_STAT_COLUMNS)
                 writer.writerows(rows)
             print(f"Excel export unavailable ({exc}). CSV written to: {csv_path}")
     
+    def _read_histogram_stats(self, file_path: Path, first_bin: int, option: str) -> Optional[List[Tuple]]:
+        """
+        Read (name, is_2d, integral, error, xl, xh, yl, yh) for the 2D histograms and the
+        1D 'lin' histograms of a ROOT file, or None if the file cannot be opened.
+
+        uproot is used when available (bulk NumPy reads, no per-histogram PyROOT calls);
+        ROOT's IntegralAndError is the fallback.
+        """
+        if HAS_UPROOT and first_bin == 1 and option == "width":
+            try:
+                stats = self._read_histogram_stats_uproot(file_path)
+            except (OSError, ValueError, uproot.DeserializationError):
+                stats = None  # unreadable or not a ROOT file for uproot: let ROOT decide
+            if stats is not None:
+                return stats
+        return self._read_histogram_stats_root(file_path, first_bin, option)
+
+    def _read_histogram_stats_uproot(self, file_path: Path) -> Optional[List[Tuple]]:
+        """uproot implementation of _read_histogram_stats (full range, bin-width weighted)
+        
+        Returns None when the file holds profiles, which are left to ROOT's IntegralAndError.
+        """
+        stats = []
+        with uproot.open(str(file_path)) as root_file:
+            # Class names come from the key list: objects that are not reported are never read.
+            # Top-level keys only, like the ROOT implementation.
+            classnames = root_file.classnames(recursive=False, cycle=False)
+            if any(classname.startswith("TProfile") for classname in classnames.values()):
+                return None
+            for key, classname in classnames.items():
+                if classname[:3] not in ("TH1", "TH2"):
+                    continue
+                is_2d = classname.startswith("TH2")
+                if not is_2d and "lin" not in key:
+                    continue
+                obj = root_file[key]
+                hist_name = obj.member("fName")
+                stats.append((hist_name, is_2d) + _width_integral_and_error(obj, is_2d))
+        return stats
+
+    def _read_histogram_stats_root(self, file_path: Path, first_bin: int, option: str) -> Optional[List[Tuple]]:
+        """ROOT implementation of _read_histogram_stats using IntegralAndError"""
+        root_file = ROOT.TFile(str(file_path), "READ")
+        if not root_file or root_file.IsZombie():
+            return None
+
+        stats = []
+        for key in root_file.GetListOfKeys():
+            # The class name is known from the key: non-histograms are never deserialized
+            class_name = key.GetClassName()
+            if not _class_inherits_from(class_name, "TH1"):
+                continue
+
+            obj = key.ReadObj()
+            ROOT.SetOwnership(obj, True)
+            hist_name = obj.GetName()
+            error = ctypes.c_double(0)
+            x_axis = obj.GetXaxis()
+            if _class_inherits_from(class_name, "TH2"):
+                y_axis = obj.GetYaxis()
+                integral = obj.IntegralAndError(first_bin, obj.GetNbinsX(), first_bin, obj.GetNbinsY(), error, option)
+                stats.append((hist_name, True, float(integral), float(error.value),
+                              float(x_axis.GetXmin()), float(x_axis.GetXmax()),
+                              float(y_axis.GetXmin()), float(y_axis.GetXmax())))
+            elif "lin" in hist_name:
+                integral = obj.IntegralAndError(first_bin, obj.GetNbinsX(), error, option)
+                stats.append((hist_name, False, float(integral), float(error.value),
+                              float(x_axis.GetXmin()), float(x_axis.GetXmax()), None, None))
+
+        root_file.Close()
+        return stats
+
     def _sort_files_by_energy_ranges(self, root_files: List[Path], energy_ranges: List[Tuple[float, float]]) -> List[Path]:
         """
         Sort ROOT files by energy ranges using configuration data.
@@ -366,8 +465,7 @@ class Exporter:
         Returns:
             Sorted list of ROOT file paths
         """
-        # Create mapping from energy range to file
-        file_energy_map = {}
+        from utils import format_energy
         
         # Calculate energy spans for ordering
         energy_spans = [(max_e - min_e, min_e, max_e) for min_e, max_e in energy_ranges]
@@ -385,46 +483,35 @@ class Exporter:
         
         sorted_ranges = sorted(energy_spans, key=sort_key)
         
+        # Index the files once by the energy tokens in their name (first file wins)
+        file_by_range = {}
+        for file_path in root_files:
+            tokens = _energy_tokens_from_name(file_path.name)
+            if tokens is not None:
+                file_by_range.setdefault(tokens, file_path)
+        
+        # Format every range once, in sorted order
+        formatted_ranges = [(format_energy(min_e), format_energy(max_e)) for span, min_e, max_e in sorted_ranges]
+        
         # For each sorted energy range, find the corresponding file
         sorted_files = []
-        for span, min_e, max_e in sorted_ranges:
-            # Find the file that matches this energy range
-            for file_path in root_files:
-                # Extract energy info from filename to match with config
-                if self._file_matches_energy_range(file_path, min_e, max_e):
-                    if file_path not in sorted_files:  # Avoid duplicates
-                        sorted_files.append(file_path)
-                    break
+        seen = set()
+        for min_str, max_str in formatted_ranges:
+            file_path = file_by_range.get((min_str, max_str))
+            if file_path is None:
+                # Custom filename templates: fall back to scanning the names for both energies
+                file_path = next((f for f in root_files if min_str in f.name and max_str in f.name), None)
+            if file_path is not None and file_path not in seen:  # Avoid duplicates
+                seen.add(file_path)
+                sorted_files.append(file_path)
         
         # Add any remaining files that weren't matched
         for file_path in root_files:
-            if file_path not in sorted_files:
+            if file_path not in seen:
                 sorted_files.append(file_path)
         
         return sorted_files
     
-    def _file_matches_energy_range(self, file_path: Path, min_energy: float, max_energy: float) -> bool:
-        """
-        Check if a ROOT file matches the given energy range by examining the filename.
-        
-        Args:
-            file_path: Path to the ROOT file
-            min_energy: Minimum energy in GeV
-            max_energy: Maximum energy in GeV
-            
-        Returns:
-            True if the filename matches the energy range
-        """
-        from utils import format_energy
-        
-        # Convert energies to formatted strings that match the filename
-        min_str = format_energy(min_energy)
-        max_str = format_energy(max_energy)
-        
-        # Check if both energy strings appear in the filename
-        filename = file_path.name
-        return min_str in filename and max_str in filename
-    
     def _extract_binning_energy_from_filename(self, file_stem: str) -> str:
         """
         Extract binning and energy range information from ROOT filename.
@@ -432,20 +519,7 @@ class Exporter:
         Example: analysis_neutrons_1000bins_0.1eV_6.0GeV.root
         Returns: 1000bins_0.1eV_6.0GeV
         """
-        # Use regex to extract the pattern: {N}bins_{min_energy}_{max_energy}
-        pattern = r'(\d+bins_[\d.]+\w+_[\d.]+\w+)'
-        match = re.search(pattern, file_stem)
-        
-        if match:
-            return match.group(1)
-        else:
-            # Fallback: try to extract just the part after the particle name
-            parts = file_stem.split('_')
-            if len(parts) >= 4:
-                # Expect format: analysis_particlename_binning_minE_maxE
-                return '_'.join(parts[2:])  # Return binning_minE_maxE
-            else:
-                return "unknown"
+        return _binning_energy_from_stem(file_stem)
     
     def _export_file_with_prefix(self, root_file_path: Path, plots_dir: Path, prefix: str) -> None:
         """
@@ -496,13 +570,18 @@ class Exporter:
         Excludes any file containing 'simulation_summary' in its name.
         Sorts by provided energy ranges if available, otherwise by filename.
         """
-        if particle_name:
-            pattern = f"analysis_{particle_name}_*.root"
-        else:
-            pattern = "analysis_*.root"
-
-        root_files = list(Path(base_dir).glob(pattern))
-        root_files = [f for f in root_files if "simulation_summary" not in f.name]
+        # Equivalent of glob("analysis_[{particle_name}_]*.root") on a single scandir pass;
+        # Path objects are only built for the kept entries
+        prefix = f"analysis_{particle_name}_" if particle_name else "analysis_"
+        try:
+            with os.scandir(base_dir) as entries:
+                root_files = [
+                    Path(entry.path) for entry in entries
+                    if entry.name.startswith(prefix) and entry.name.endswith(".root")
+                    and "simulation_summary" not in entry.name and entry.is_file()
+                ]
+        except FileNotFoundError:
+            root_files = []
 
         if not root_files:
             return []
@@ -519,9 +598,14 @@ class Exporter:
         from utils import format_energy
 
         if energy_ranges:
-            for min_e, max_e in energy_ranges:
-                if self._file_matches_energy_range(file_path, min_e, max_e):
-                    return f"{format_energy(min_e)} - {format_energy(max_e)}"
+            tokens = _energy_tokens_from_name(file_path.name)
+            formatted = [(format_energy(min_e), format_energy(max_e)) for min_e, max_e in energy_ranges]
+            if tokens in formatted:
+                return f"{tokens[0]} - {tokens[1]}"
+            # Custom filename templates: fall back to scanning the name for both energies
+            for min_str, max_str in formatted:
+                if min_str in file_path.name and max_str in file_path.name:
+                    return f"{min_str} - {max_str}"
             return "unknown"
 
         info = self._extract_binning_energy_from_filename(file_path.stem)
@@ -537,6 +621,8 @@ class Exporter:
         """
         destination_dir = Path(output_dir)
         destination_dir.mkdir(parents=True, exist_ok=True)
+        # Output paths are plain strings built from this prefix (no Path objects per histogram)
+        path_prefix = os.path.join(str(destination_dir), name_prefix)
 
         root_file = ROOT.TFile(str(root_file_path), "READ")
         if not root_file or root_file.IsZombie():
@@ -547,54 +633,91 @@ class Exporter:
         keys = root_file.GetListOfKeys()
         set_style, style_h1, style_h2, quiet = self.style_env
 
-        histogram_count = 0
-        for key in keys:
-            obj = key.ReadObj()
-            if not obj.InheritsFrom("TH1"):
-                continue
+        # A single PDF backend for the whole file instead of one per histogram; it is opened
+        # on the first histogram and closed after the last one
+        multipage_path = f"{path_prefix}{root_file_path.stem}.pdf" if self.multipage else None
 
-            is_2d = obj.InheritsFrom("TH2")
-            hist_name = obj.GetName()
-            pdf_filename = f"{name_prefix}{hist_name}.pdf"
-            pdf_path = destination_dir / pdf_filename
-
-            style = style_h2 if is_2d else style_h1
-            with set_style(style):
-                canvas = ROOT.TCanvas(hist_name, hist_name, 700, 600)
-                if is_2d:
-                    canvas.SetLogz()
-                    obj.Draw("colz")
-                else:
-                    canvas.SetLogy()
-                    # If this histogram corresponds to the "log" variant from config, set X axis to log scale
-                    try:
-                        if ("_log" in hist_name) and ("_lin" not in hist_name):
-                            canvas.SetLogx()
-                    except Exception:
-                        pass
-                    obj.Draw("hist")
-                with quiet:
-                    canvas.SaveAs(str(pdf_path))
-                    if self.save_macro:
-                        macro_path = pdf_path.with_suffix('.C')
-                        canvas.SaveAs(str(macro_path))
-                with quiet:
-                    canvas.SaveAs(str(pdf_path))
-                    if self.save_macro:
-                        macro_path = pdf_path.with_suffix('.C')
-                        canvas.SaveAs(str(macro_path))
-
-            histogram_count += 1
-
-            # Print integral for 1D 'lin' histograms
-            if (not is_2d) and ("lin" in hist_name) and self.verbose:
-                self._print_histogram_statistics(obj, hist_name, indent=indent_print)
+        # One canvas per style (1D/2D), created lazily under its style and reused for every histogram
+        canvases = {}
+        histogram_count = 0
+        # ROOT info output is silenced once for the whole loop rather than around every save
+        with quiet:
+            # Histograms are read one at a time, so only the one being drawn is in memory
+            for key in keys:
+                # Skip non-histogram keys without reading them from disk
+                if not _class_inherits_from(key.GetClassName(), "TH1"):
+                    continue
+                obj = key.ReadObj()
+                ROOT.SetOwnership(obj, True)
+                is_2d = obj.InheritsFrom("TH2")
+                hist_name = obj.GetName()
+                pdf_path = f"{path_prefix}{hist_name}.pdf"
+                macro_path = f"{path_prefix}{hist_name}.C"
+
+                style = style_h2 if is_2d else style_h1
+                with set_style(style):
+                    canvas = canvases.get(is_2d)
+                    if canvas is None:
+                        canvas = ROOT.TCanvas(hist_name, hist_name, 700, 600)
+                        canvases[is_2d] = canvas
+                    else:
+                        # Keep the per-histogram name/title (used in saved macros) and reset the pad state
+                        canvas.SetName(hist_name)
+                        canvas.SetTitle(hist_name)
+                        canvas.cd()
+                        canvas.Clear()
+                        canvas.SetLogx(0)
+                        canvas.SetLogy(0)
+                        canvas.SetLogz(0)
+                    if is_2d:
+                        canvas.SetLogz()
+                        obj.Draw("colz")
+                    else:
+                        canvas.SetLogy()
+                        # If this histogram corresponds to the "log" variant from config, set X axis to log scale
+                        try:
+                            if ("_log" in hist_name) and ("_lin" not in hist_name):
+                                canvas.SetLogx()
+                        except Exception:
+                            pass
+                        obj.Draw("hist")
+                    if multipage_path:
+                        if histogram_count == 0:
+                            canvas.Print(f"{multipage_path}[")
+                        canvas.Print(multipage_path, f"Title:{hist_name}")
+                        if self.save_macro:
+                            canvas.SaveAs(macro_path)
+                    else:
+                        canvas.SaveAs(pdf_path)
+                        if self.save_macro:
+                            canvas.SaveAs(macro_path)
+
+                histogram_count += 1
+
+                # Print integral for 1D 'lin' histograms
+                if (not is_2d) and ("lin" in hist_name) and self.verbose:
+                    self._print_histogram_statistics(obj, hist_name, indent=indent_print)
+
+            if multipage_path and histogram_count:
+                canvas.Print(f"{multipage_path}]")
+            else:
+                multipage_path = None
 
         if indent_print:
             print(f"{indent_print}Exported {histogram_count} histograms from {root_file_path.name}")
+            if multipage_path:
+                print(f"{indent_print}Combined PDF: {Path(multipage_path).name}")
         root_file.Close()
 
 
+def _export_file_worker(root_file_path: str, plots_dir: str, prefix: str,
+                        verbose: bool, save_macro: bool, multipage: bool) -> None:
+    """Process-pool worker: export one ROOT file with a freshly set up ROOT state"""
+    print(f"\nProcessing file: {Path(root_file_path).name}")
+    exporter = Exporter(verbose=verbose, save_macro=save_macro, multipage=multipage)
+    exporter._export_histograms_from_file(Path(root_file_path), output_dir=plots_dir, name_prefix=prefix, indent_print="    ")
+
+
 # Convenience functions for backward compatibility and easy imports
 def export_histograms_to_pdf(root_file_path: str, 
                             output_dir: str = "./Analysis",
@@ -618,7 +741,9 @@ def export_all_analysis_histograms_to_pdf(output_dir: str,
                                          style_env: Optional[Tuple] = None,
                                          verbose: bool = True,
                                          energy_ranges: Optional[List[Tuple[float, float]]] = None,
-                                         save_macro: bool = False) -> None:
+                                         save_macro: bool = False,
+                                         multipage: bool = False,
+                                         jobs: int = 1) -> None:
     """
     Export all histograms from multiple analysis ROOT files to organized PDF files.
     
@@ -628,9 +753,12 @@ def export_all_analysis_histograms_to_pdf(output_dir: str,
         style_env: Style environment tuple or None
         verbose: Print integral information for 1D 'lin' histograms
         energy_ranges: List of (min_energy, max_energy) tuples in GeV for proper ordering
+        save_macro: Also save each plot as a ROOT macro (.C)
+        multipage: Write one multi-page PDF per ROOT file instead of one PDF per histogram
+        jobs: Number of files exported in parallel processes (default: 1, serial)
     """
-    exporter = Exporter(style_env=style_env, verbose=verbose, save_macro=save_macro)
-    exporter.export_all_analysis_files(output_dir, particle_name, energy_ranges)
+    exporter = Exporter(style_env=style_env, verbose=verbose, save_macro=save_macro, multipage=multipage)
+    exporter.export_all_analysis_files(output_dir, particle_name, energy_ranges, jobs=jobs)
 
 
 def export_histogram_statistics_to_excel(output_dir: str,
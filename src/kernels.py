@@ -0,0 +1,116 @@
+"""
+Numerical kernels shared by the analysis modules.
+
+Kernels are JIT-compiled with Numba when it is installed; otherwise an
+equivalent NumPy implementation is used.
+"""
+
+import math
+
+import numpy as np
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+def _nonzero_minmax_loop(contents, centers):
+    min_y = np.inf
+    min_x = np.inf
+    max_x = -np.inf
+    for i in range(contents.shape[0]):
+        val = contents[i]
+        if val > 0:
+            if val < min_y:
+                min_y = val
+            x = centers[i]
+            if x < min_x:
+                min_x = x
+            if x > max_x:
+                max_x = x
+    return min_y, min_x, max_x
+
+
+def _nonzero_minmax_numpy(contents, centers):
+    mask = contents > 0
+    if not mask.any():
+        return np.inf, np.inf, -np.inf
+    nz_centers = centers[mask]
+    return float(contents[mask].min()), float(nz_centers.min()), float(nz_centers.max())
+
+
+if HAS_NUMBA:
+    _nonzero_minmax_jit = njit(cache=True)(_nonzero_minmax_loop)
+
+
+def nonzero_minmax(contents: np.ndarray, centers: np.ndarray):
+    """Return (min_y, min_x, max_x) over the bins with positive content.
+
+    min_y is the smallest positive bin content, min_x/max_x the extreme centers of
+    those bins. When no bin is positive, (inf, inf, -inf) is returned.
+    """
+    if HAS_NUMBA:
+        return _nonzero_minmax_jit(contents, centers)
+    return _nonzero_minmax_numpy(contents, centers)
+
+
+def _parallel_jobs_loop(times, deltas, total_duration, need_std_error):
+    # Running job count in a platform integer (deltas may be int8)
+    active = 0
+    weighted_sum = 0.0
+    n_intervals = 0
+    for i in range(times.shape[0] - 1):
+        active += deltas[i]
+        dt = times[i + 1] - times[i]
+        if dt > 0:
+            weighted_sum += dt * active
+            n_intervals += 1
+    average = weighted_sum / total_duration if total_duration > 0 else 0.0
+    if not need_std_error:
+        return average, 0.0
+
+    active = 0
+    squared_sum = 0.0
+    for i in range(times.shape[0] - 1):
+        active += deltas[i]
+        dt = times[i + 1] - times[i]
+        if dt > 0:
+            squared_sum += dt * (active - average) ** 2
+    std_error = np.sqrt(squared_sum / total_duration) / np.sqrt(n_intervals)
+    return average, std_error
+
+
+def _parallel_jobs_numpy(times, deltas, total_duration, need_std_error):
+    # np.cumsum promotes int8 deltas to the platform integer, so no overflow
+    active_jobs = np.cumsum(deltas)[:-1]
+    dt = np.diff(times)
+    n_intervals = np.count_nonzero(dt > 0)
+
+    weighted_sum = float(np.dot(dt, active_jobs))
+    average = weighted_sum / total_duration if total_duration > 0 else 0.0
+    if not need_std_error:
+        return average, 0.0
+
+    variance = float(np.dot(dt, (active_jobs - average) ** 2)) / total_duration
+    return average, math.sqrt(variance) / math.sqrt(n_intervals)
+
+
+if HAS_NUMBA:
+    _parallel_jobs_jit = njit(cache=True)(_parallel_jobs_loop)
+
+
+def parallel_jobs(times: np.ndarray, deltas: np.ndarray, total_duration: float,
+                  need_std_error: bool = True):
+    """Return (average, std_error) of the number of jobs running in parallel.
+
+    times are the job start/end events sorted by time, with starts before ends
+    at equal times, and deltas the matching +1 (start) / -1 (end) steps. The job count is constant between consecutive
+    events; zero-length intervals carry no weight and are not counted for the
+    standard error. std_error is 0.0 when need_std_error is False.
+    """
+    if HAS_NUMBA:
+        average, std_error = _parallel_jobs_jit(times, deltas, float(total_duration), need_std_error)
+        return float(average), float(std_error)
+    return _parallel_jobs_numpy(times, deltas, total_duration, need_std_error)
@@ -1,7 +1,41 @@
-import datetime
-import math
+import json
+import os
+import numpy as np
 import ROOT
-from typing import List, Tuple
+from typing import List, NamedTuple, Optional, Tuple
+from kernels import parallel_jobs
+
+try:
+    import uproot
+    HAS_UPROOT = True
+except ImportError:
+    HAS_UPROOT = False
+
+# Branches of the SimSummary tree, in the order of the SummaryRow members
+_SUMMARY_BRANCHES = ("MeanAvgTime", "EOT", "MinStart", "MaxEnd", "TotalDuration", "AverageParallelJobs")
+
+_SUMMARY_ROW_DECL = """
+#ifndef BDX_SUMMARY_ROW
+#define BDX_SUMMARY_ROW
+struct SummaryRow { double %s; };
+#endif
+""" % ", ".join(_SUMMARY_BRANCHES)
+
+class SummaryResult(NamedTuple):
+    """Values written to the SimSummary tree by SimulationSummary.process_summary"""
+    EOT: float
+    MeanAvgTime: float
+    MinStart: float
+    MaxEnd: float
+    TotalDuration: float
+    AverageParallelJobs: float
+
+    def __float__(self):
+        # Callers that only need the EOT can keep treating the result as a number
+        return float(self.EOT)
+
+# EOT values already read, keyed by (absolute path, modification time) of the summary file
+_EOT_CACHE = {}
 
 class SimulationSummary:
     """Class to handle processing and analysis of simulation summary data"""
@@ -9,6 +43,9 @@ class SimulationSummary:
     def __init__(self, summary_dataframe):
         """Initialize with a RDataFrame containing summary data"""
         self.RSummary = summary_dataframe
+        # Branch buffer, reused by every SimSummary tree this instance writes
+        ROOT.gInterpreter.Declare(_SUMMARY_ROW_DECL)
+        self._row = ROOT.SummaryRow()
 
     @classmethod
     def read_eot_from_file(cls, summary_file_path: str) -> float:
@@ -20,6 +57,22 @@ class SimulationSummary:
         Returns:
             float: Total number of events (EOT)
         """
+        eot_value = None
+        if HAS_UPROOT:
+            # Lightweight read of the single EOT entry; ROOT is the fallback
+            try:
+                with uproot.open(summary_file_path) as summary_file:
+                    eot_value = float(summary_file["SimSummary/EOT"].array(library="np")[0])
+            except Exception:
+                pass  # e.g. old or unreadable file: let ROOT decide
+        if eot_value is None:
+            eot_value = cls._read_eot_root(summary_file_path)
+        print(f"Read EOT from existing summary file: {eot_value}")
+        return eot_value
+
+    @staticmethod
+    def _read_eot_root(summary_file_path: str) -> float:
+        """ROOT implementation of read_eot_from_file"""
         try:
             summary_file = ROOT.TFile(summary_file_path, "READ")
             if not summary_file or summary_file.IsZombie():
@@ -34,118 +87,166 @@ class SimulationSummary:
             eot_value = tree.EOT
             
             summary_file.Close()
-            print(f"Read EOT from existing summary file: {eot_value}")
             return eot_value
             
         except Exception as e:
             raise RuntimeError(f"Error reading EOT from summary file {summary_file_path}: {e}")
 
-    def process_summary(self, output_file: ROOT.TFile) -> float:
+    @classmethod
+    def read_eot_cached(cls, summary_file_path: str) -> float:
+        """Read EOT once per summary file version (JSON sidecar first, then the ROOT file)
+        
+        Args:
+            summary_file_path: Path to the simulation summary ROOT file
+            
+        Returns:
+            float: Total number of events (EOT)
+        """
+        key = (os.path.abspath(summary_file_path), os.stat(summary_file_path).st_mtime_ns)
+        eot_value = _EOT_CACHE.get(key)
+        if eot_value is None:
+            eot_value = cls.read_eot_from_sidecar(summary_file_path)
+            if eot_value is None:
+                eot_value = cls.read_eot_from_file(summary_file_path)
+            _EOT_CACHE[key] = eot_value
+        return eot_value
+
+    @staticmethod
+    def eot_sidecar_path(summary_file_path: str) -> str:
+        """Path of the file caching the EOT of a summary ROOT file (JSON content)
+        
+        The .eot suffix keeps it from being taken for a config file by --config-dir scans.
+        """
+        return os.path.splitext(summary_file_path)[0] + ".eot"
+
+    @classmethod
+    def read_eot_from_sidecar(cls, summary_file_path: str) -> Optional[float]:
+        """Read EOT from the JSON sidecar without opening the ROOT file
+        
+        Args:
+            summary_file_path: Path to the simulation summary ROOT file
+            
+        Returns:
+            float: EOT, or None if the sidecar is missing, unreadable or older than the ROOT file
+        """
+        sidecar_path = cls.eot_sidecar_path(summary_file_path)
+        try:
+            if os.stat(sidecar_path).st_mtime_ns < os.stat(summary_file_path).st_mtime_ns:
+                return None
+            with open(sidecar_path) as f:
+                return float(json.load(f)["EOT"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    @classmethod
+    def write_eot_sidecar(cls, summary_file_path: str, eot: float) -> None:
+        """Write the JSON sidecar next to the summary ROOT file (best effort)"""
+        sidecar_path = cls.eot_sidecar_path(summary_file_path)
+        tmp_path = f"{sidecar_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"EOT": float(eot)}, f)
+            os.replace(tmp_path, sidecar_path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def process_summary(self, output_file: ROOT.TFile) -> SummaryResult:
         """Process and save summary information
         
         Args:
             output_file: ROOT file to save summary data to
             
         Returns:
-            float: Total number of events (EOT)
+            SummaryResult: EOT and the other values stored in the SimSummary tree
         """
-        TotEvents = self.RSummary.Sum("TotEvents")
-        AvgTime = self.RSummary.Mean("AvgTime")
+        # Book every result before reading any, so that they are all filled in one event loop
+        RTimes = self.RSummary.Define("EndTime", "StartTime + TotTime")
+        TotEvents = RTimes.Sum("TotEvents")
+        AvgTime = RTimes.Mean("AvgTime")
+        MinStartTime = RTimes.Min("StartTime")
+        MaxEndTime = RTimes.Max("EndTime")
+        timing = RTimes.AsNumpy(["StartTime", "EndTime"], lazy=True)
 
         MeanAvgTime = AvgTime.GetValue()
         EOT = TotEvents.GetValue()
 
-        min_start_time = self.RSummary.Min("StartTime").GetValue()
-        max_start_time = self.RSummary.Max("StartTime").GetValue()
-
-        print(f"Total number of primaries simulated: {TotEvents.GetValue()}")
+        print(f"Total number of primaries simulated: {EOT}")
         print(f"Mean AvgTime per primary: {MeanAvgTime:.3e} s")
 
-        # Create and fill summary tree
+        # Create and fill summary tree: one double branch per SummaryRow member
         tree = ROOT.TTree("SimSummary", "Summary of simulation")
         
-        from array import array
-        bMeanAvgTime = array('d', [0])
-        bEOT = array('d', [0])
-        bMinStart = array('d', [0])
-        bMaxEnd = array('d', [0])
-        bTotalDuration = array('d', [0])
-        bAverageParallelJobs = array('d', [0])
-
-        tree.Branch("MeanAvgTime", bMeanAvgTime, "MeanAvgTime/D")
-        tree.Branch("EOT", bEOT, "EOT/D")
-        tree.Branch("MinStart", bMinStart, "MinStart/D")
-        tree.Branch("MaxEnd", bMaxEnd, "MaxEnd/D")
-        tree.Branch("TotalDuration", bTotalDuration, "TotalDuration/D")
-        tree.Branch("AverageParallelJobs", bAverageParallelJobs, "AverageParallelJobs/D")
+        row = self._row
+        for name in _SUMMARY_BRANCHES:
+            tree.Branch(name, ROOT.addressof(row, name), f"{name}/D")
 
         # Process timing information
-        start_times = self.RSummary.AsNumpy(["StartTime"])["StartTime"]
-        runtimes = self.RSummary.AsNumpy(["TotTime"])["TotTime"]
-        end_times = start_times + runtimes
-        
-        # Convert to datetime
-        start_times = [datetime.datetime.fromtimestamp(t) for t in start_times]
-        end_times = [datetime.datetime.fromtimestamp(t) for t in end_times]
+        # Timestamps stay float64 epoch seconds: only min/max and differences are needed
+        min_start = float(MinStartTime.GetValue())
+        max_end = float(MaxEndTime.GetValue())
+        timing = timing.GetValue()
+        start_times = np.asarray(timing["StartTime"], dtype=np.float64)
+        end_times = np.asarray(timing["EndTime"], dtype=np.float64)
+        total_duration = max_end - min_start
         
-        min_start = min(start_times)
-        max_end = max(end_times)
-        total_duration = (max_end - min_start).total_seconds()
-        
-        # Calculate average parallel jobs
-        average_parallel_jobs, std_error = self._calculate_parallel_jobs(start_times, end_times, total_duration)
+        # Calculate average parallel jobs (the standard error is not stored)
+        average_parallel_jobs, _ = self._calculate_parallel_jobs(start_times, end_times, total_duration,
+                                                                 need_std_error=False)
         
         # Fill tree values
-        bMeanAvgTime[0] = MeanAvgTime
-        bEOT[0] = EOT
-        bMinStart[0] = min_start.timestamp()
-        bMaxEnd[0] = max_end.timestamp()
-        bTotalDuration[0] = total_duration
-        bAverageParallelJobs[0] = average_parallel_jobs
+        row.MeanAvgTime = MeanAvgTime
+        row.EOT = EOT
+        row.MinStart = min_start
+        row.MaxEnd = max_end
+        row.TotalDuration = total_duration
+        row.AverageParallelJobs = average_parallel_jobs
 
+        # Single-entry tree: no auto-flush while filling, one explicit flush of every basket
+        tree.SetAutoFlush(0)
         tree.Fill()
+        tree.FlushBaskets()
         tree.Write()
         
-        return EOT
+        return SummaryResult(EOT, MeanAvgTime, min_start, max_end, total_duration, average_parallel_jobs)
 
-    def _calculate_parallel_jobs(self, start_times: List[datetime.datetime], 
-                               end_times: List[datetime.datetime], 
-                               total_duration: float) -> Tuple[float, float]:
+    def _calculate_parallel_jobs(self, start_times: np.ndarray, 
+                               end_times: np.ndarray, 
+                               total_duration: float,
+                               need_std_error: bool = True) -> Tuple[float, float]:
         """Calculate average number of parallel jobs running
         
         Args:
-            start_times: List of job start times
-            end_times: List of job end times
+            start_times: Job start times (epoch seconds)
+            end_times: Job end times (epoch seconds)
             total_duration: Total duration of all jobs in seconds
+            need_std_error: If False, skip the variance pass and return 0.0 as standard error
             
         Returns:
             Tuple containing:
             - float: Average number of parallel jobs
             - float: Standard error of the average
         """
-        time_events = []
-        for start, end in zip(start_times, end_times):
-            time_events.append((start, 1))
-            time_events.append((end, -1))
-        
-        time_events.sort()
+        # No jobs, or all of them instantaneous: nothing ran in parallel
+        n_jobs = len(start_times)
+        if n_jobs == 0 or total_duration <= 0:
+            return 0.0, 0.0
         
-        active_jobs = 0
-        time_intervals = []
-        prev_time = min(start_times)
-        
-        for event_time, delta in time_events:
-            delta_time = (event_time - prev_time).total_seconds()
-            if delta_time > 0:
-                time_intervals.append((delta_time, active_jobs))
-            active_jobs += delta
-            prev_time = event_time
-            
-        weighted_sum = sum(dt * jobs for dt, jobs in time_intervals)
-        average_parallel_jobs = weighted_sum / total_duration if total_duration > 0 else 0
+        # +1 at every start, -1 at every end, sorted by time. At equal times starts come
+        # before ends, so the running job count never goes negative; the statistics do not
+        # depend on this (zero-length intervals carry no weight) but it is deterministic.
+        times = np.empty(2 * n_jobs, dtype=np.float64)
+        times[:n_jobs] = start_times
+        times[n_jobs:] = end_times
+        deltas = np.empty(2 * n_jobs, dtype=np.int8)
+        deltas[:n_jobs] = 1
+        deltas[n_jobs:] = -1
+        order = np.lexsort((-deltas, times))
         
-        variance = sum(dt * (jobs - average_parallel_jobs)**2 for dt, jobs in time_intervals) / total_duration
-        std_dev = math.sqrt(variance)
-        std_error = std_dev / math.sqrt(len(time_intervals))
+        # Numba-compiled event loop when available, NumPy cumulative sum otherwise
+        average_parallel_jobs, std_error = parallel_jobs(times[order], deltas[order], total_duration,
+                                                         need_std_error)
         
         return average_parallel_jobs, std_error
@@ -1,11 +1,9 @@
 import sys
 import os
+from functools import lru_cache
+import numpy as np
 import ROOT
 from typing import List, Tuple
-import pint
-
-# Initialize the unit registry
-ureg = pint.UnitRegistry()
 
 class DummyStyleManager:
     """A dummy context manager to use when pyROOTUtils is not available"""
@@ -18,25 +16,29 @@ class DummyStyleManager:
     def __exit__(self, exc_type, exc_val, exc_tb):
         pass
 
+# (upper bound in GeV, unit, multiplier from GeV), in increasing order; GeV above the last
+_ENERGY_TIERS = (
+    (1e-6, "eV", 1e9),
+    (1e-3, "keV", 1e6),
+    (1.0, "MeV", 1e3),
+)
+
+@lru_cache(maxsize=256)
 def format_energy(energy_gev):
     """Format energy value with appropriate units"""
-    energy = energy_gev * ureg.GeV
-    if energy.to('eV').magnitude < 1000:
-        return f"{energy.to('eV').magnitude:.1f}eV"
-    elif energy.to('keV').magnitude < 1000:
-        return f"{energy.to('keV').magnitude:.1f}keV"
-    elif energy.to('MeV').magnitude < 1000:
-        return f"{energy.to('MeV').magnitude:.1f}MeV"
-    else:
-        return f"{energy.to('GeV').magnitude:.1f}GeV"
+    for upper, unit, multiplier in _ENERGY_TIERS:
+        if energy_gev < upper:
+            return f"{energy_gev * multiplier:.1f}{unit}"
+    return f"{energy_gev:.1f}GeV"
     
 def parse_energy_ranges(ranges_str: str) -> List[Tuple[float, float]]:
     """Parse energy ranges from string input"""
-    ranges = []
-    for r in ranges_str.split(','):
-        min_e, max_e = map(float, r.split('-'))
-        ranges.append((min_e, max_e))
-    return ranges
+    # "a-b,c-d" -> [a, b, c, d] in one NumPy conversion
+    values = ranges_str.replace('-', ',').split(',')
+    if len(values) != 2 * (ranges_str.count(',') + 1):
+        raise ValueError(f"Invalid energy ranges: {ranges_str!r} (expected 'min-max,min-max,...')")
+    bounds = np.fromiter(values, dtype=np.float64, count=len(values)).reshape(-1, 2)
+    return [(float(min_e), float(max_e)) for min_e, max_e in bounds]
 
 class QuietRoot:
     """A context manager to suppress ROOT warnings"""
@@ -52,13 +54,38 @@ class QuietRoot:
     def __exit__(self, exc_type, exc_val, exc_tb):
         ROOT.gErrorIgnoreLevel = self.old_level
 
+# C++ helpers used in jitted RDataFrame expressions (guarded so declaring twice is harmless)
+_CPP_HELPERS = """
+#ifndef BDX_CPP_HELPERS
+#define BDX_CPP_HELPERS
+#include <algorithm>
+#include <initializer_list>
+// Membership test against a sorted list of values, used for large particle ID sets
+inline bool bdx_in_sorted(int x, std::initializer_list<int> values) {
+    return std::binary_search(values.begin(), values.end(), x);
+}
+#endif
+"""
+
+# Result of the first setup_root call in this process
+_SETUP_CACHE = None
+
 def setup_root():
     """Initialize ROOT settings and return style configuration
     
+    The setup runs once per process; later calls return the same objects.
+    
     Returns:
         tuple: (set_style, stileh1, stileh2, quiet) style configuration objects and quiet mode
     """
-    ROOT.EnableImplicitMT()
+    global _SETUP_CACHE
+    if _SETUP_CACHE is not None:
+        return _SETUP_CACHE
+    
+    # BDX_MT sets the number of RDataFrame threads (0 or unset: all cores).
+    if not ROOT.IsImplicitMTEnabled():
+        ROOT.EnableImplicitMT(int(os.getenv("BDX_MT", "0")))
+    ROOT.gInterpreter.Declare(_CPP_HELPERS)
     
     # Default to dummy style manager
     set_style = DummyStyleManager
@@ -69,7 +96,8 @@ def setup_root():
     # Try to import pyROOTUtils if available
     pyrootutils_path = os.getenv("PYROOTUTILS")
     if pyrootutils_path:
-        sys.path.append(pyrootutils_path)
+        if pyrootutils_path not in sys.path:
+            sys.path.append(pyrootutils_path)
         try:
             from pyROOTUtils.root_set_style import set_style
             from pyROOTUtils.article_style import th1_style, th2_style
@@ -78,4 +106,5 @@ def setup_root():
         except ImportError:
             print("Warning: Could not import pyROOTUtils styles, using default ROOT styles")
             
-    return set_style, stileh1, stileh2, quiet
\ No newline at end of file
+    _SETUP_CACHE = (set_style, stileh1, stileh2, quiet)
+    return _SETUP_CACHE
@@ -0,0 +1,27 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from analysis import find_config_files
+
+
+class FindConfigFilesTest(unittest.TestCase):
+    def test_eot_sidecar_in_output_directory_is_ignored(self):
+        with tempfile.TemporaryDirectory() as config_dir:
+            config_path = os.path.join(config_dir, "analysis.yaml")
+            output_dir = os.path.join(config_dir, "output")
+            os.mkdir(output_dir)
+            for path in (config_path,
+                         os.path.join(output_dir, "simulation_summary.root"),
+                         os.path.join(output_dir, "simulation_summary.eot")):
+                with open(path, "w") as f:
+                    f.write("{}")
+
+            self.assertEqual(list(find_config_files(config_dir)), [config_path])
+
+
+if __name__ == "__main__":
+    unittest.main()